@@ -23,14 +23,49 @@ https://git.vpgrp.io/noc/python-mdc
 
 
 # Import samsung_mdc modules
-from . import util, mdc
+from . import (util, mdc, history, pacing, fleet, poller, capture, scheduler,
+               wall, breaker, inventory, commands, aio, gateway)
 
-# Import MDC class
+# Import MDC classes
 from .mdc import MultipleDisplayControl
+from .aio import AsyncMultipleDisplayControl
+
+# Import fleet and inventory
+from .fleet import Fleet
+from .inventory import Inventory
+
+# Import HTTP/JSON gateway
+from .gateway import Gateway
+
+# Import video wall
+from .wall import VideoWall
+
+# Import circuit breaker
+from .breaker import CircuitBreaker
+
+# Import scheduler
+from .scheduler import Scheduler
+
+# Import poller
+from .poller import Poller
+
+# Import wire capture and replay
+from .capture import Capture, ReplayPanel
+
+# Import adaptive pacer
+from .pacing import Pacer
+
+# Import history log
+from .history import History
 
 # Make only a selection available to __all__ to not clutter the namespace
 # Maybe also to discourage the use of `from samsung_mdc import *`.
-__all__ = ['util', 'mdc', 'MultipleDisplayControl']
+__all__ = ['util', 'mdc', 'history', 'pacing', 'fleet', 'poller', 'capture',
+           'scheduler', 'wall', 'breaker', 'inventory', 'commands', 'aio',
+           'gateway', 'MultipleDisplayControl', 'AsyncMultipleDisplayControl',
+           'Fleet', 'Inventory', 'Gateway', 'History', 'Pacer', 'Poller',
+           'Capture', 'ReplayPanel', 'Scheduler', 'VideoWall',
+           'CircuitBreaker']
 
 # Version
 try:
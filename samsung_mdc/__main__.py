@@ -11,12 +11,14 @@ Samsung Multiple Display Control command line tool.
 import argparse
 
 # relative imports
+from .commands import COMMANDS
 from .mdc import MultipleDisplayControl
 try:
     from .version import version
 except (ValueError, ModuleNotFoundError, SyntaxError):
     version = "VERSION-NOT-FOUND"
 
+
 def main():
     """A simple command-line-tool for direct control of the Samsung Multiple
     Display Control Protocol via TCP/IP
@@ -31,9 +33,7 @@ def main():
         help='Remote TV ipv4-address'
     )
 
-    commands = ('power', 'volume', 'mute', 'source', 'screen_size',
-                'video_wall_mode', 'safety_lock', 'video_wall_on',
-                'video_wall_user')
+    commands = tuple(COMMANDS)
     parser.add_argument(
         'command', metavar='command', choices=commands,
         help=('Control command name. Allowed values are: '+', '.join(commands))
@@ -73,12 +73,12 @@ def main():
         print(ctrl, end=' .. ')
         if len(args.data) == 0:
             # get
-            value = eval(f'ctrl.get_{args.command}()')
+            value = getattr(ctrl, f'get_{args.command}')()
             print(f'{args.command} is {value}')
         else:
             # get
             args.data = [int(d) if d.isdigit() else d for d in args.data]
-            eval(f'ctrl.set_{args.command}(*args.data)')
+            getattr(ctrl, f'set_{args.command}')(*args.data)
             args.data = args.data[0] if len(args.data) == 1 else args.data
             print(f'{args.command} set to {args.data}')
 
@@ -0,0 +1,218 @@
+r"""
+
+:mod:`aio` -- Asyncio
+=====================
+
+Samsung Multiple Display Control object for asyncio
+
+"""
+
+# mandatory imports
+import asyncio
+
+# relative imports
+from .commands import COMMANDS, lookup, _installers
+from .fleet import _display_spec
+
+
+__all__ = ['AsyncMultipleDisplayControl']
+
+
+class AsyncMultipleDisplayControl(object):
+    """
+    """
+
+    __slots__ = (
+        "__host",
+        "__port",
+        "__id",
+        "__timeout",
+        "__reader",
+        "__writer",
+        "__lock",
+    )
+
+    def __init__(self, host: str, port: int = None, id: int = None,
+                 timeout: float = None):
+        """Construct a Samsung Multiple Display Control (MDC) object for
+        asyncio.
+
+        The ``get_<name>`` and ``set_<name>`` coroutines are generated from
+        the command registry, as for :class:`MultipleDisplayControl`.
+
+        Parameters:
+        -----------
+        host : `string`
+            Host ipv4-address.
+
+        port : `int`, optional
+            Connection port [0, 65535]. Defaults to 1515.
+
+        id : `int`, optional
+            Display id [0, 255]. Defaults to 254 for globing.
+
+        timeout : `float`, optional
+            Timeout of the connect and of each command, in seconds
+            (default: 5.).
+
+        Example:
+        --------
+
+        >>> async with AsyncMultipleDisplayControl('192.168.1.100') as mdc:
+                await mdc.set_power(True)
+                print(await mdc.get_source())
+        """
+        self.__host, self.__port, self.__id = _display_spec((host, port, id))
+        self.__timeout = timeout or 5.
+        self.__reader = None
+        self.__writer = None
+        self.__lock = None
+
+    def __str__(self):
+        """Printable string representation of an MDC object.
+        """
+        return 'MDC #{} @{}:{}'.format(
+            hex(self.id), self.host, self.port
+        )
+
+    def __repr__(self):
+        """String representation of an MDC object.
+        """
+        return ('AsyncMultipleDisplayControl(host={}, port={}, '
+                'mdc_id={})').format(self.host, self.port, hex(self.id))
+
+    async def __aenter__(self):
+        """Enter an MDC object.
+        """
+        if not self.connected:
+            await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        """Exit the MDC object.
+        """
+        await self.close()
+
+    @property
+    def host(self):
+        return self.__host
+
+    @property
+    def port(self):
+        return self.__port
+
+    @property
+    def id(self):
+        return self.__id
+
+    @property
+    def timeout(self):
+        return self.__timeout
+
+    @property
+    def connected(self):
+        return self.__writer is not None and not self.__writer.is_closing()
+
+    async def connect(self):
+        """Connect to the remote TV
+        """
+        self.__reader, self.__writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.__timeout
+        )
+        self.__lock = asyncio.Lock()
+
+    async def close(self):
+        """Close the connection to the remote TV
+        """
+        if self.__writer is not None:
+            self.__writer.close()
+            try:
+                await self.__writer.wait_closed()
+            except OSError:
+                pass
+        self.__reader = self.__writer = None
+
+    async def _read_frame(self):
+        """Private helper to read a single reply frame from the remote TV
+        """
+        while (await self.__reader.readexactly(1))[0] != 0xAA:
+            pass
+        head = await self.__reader.readexactly(3)
+        return bytes([0xAA]) + head + await self.__reader.readexactly(
+            head[2] + 1
+        )
+
+    async def _reply(self, command):
+        """Private helper to read and decode the reply to a command
+        """
+        while True:
+            frame = await asyncio.wait_for(self._read_frame(), self.__timeout)
+            # skip late replies to earlier commands that timed out
+            if len(frame) > 5 and frame[5] == command.code:
+                return command.parse(frame)
+
+    async def _request(self, command, frame: bytes):
+        """Private helper to send a command frame and decode its reply
+        """
+        if not self.connected:
+            raise RuntimeError('socket is not connected')
+        async with self.__lock:
+            self.__writer.write(frame)
+            await self.__writer.drain()
+            return await self._reply(command)
+
+    async def batch(self, requests):
+        """Pipeline several commands over the connection.
+
+        Parameters and return value are as for
+        :meth:`MultipleDisplayControl.batch`.
+        """
+        if not self.connected:
+            raise RuntimeError('socket is not connected')
+        commands = []
+        for method, *args in requests:
+            command, action = lookup(method)
+            commands.append((command, command.get_frame(self.id)
+                             if action == 'get'
+                             else command.set_frame(self.id, *args)))
+        async with self.__lock:
+            for command, frame in commands:
+                self.__writer.write(frame)
+            await self.__writer.drain()
+            results = []
+            for command, frame in commands:
+                try:
+                    results.append(await self._reply(command))
+                except (RuntimeError, ValueError) as e:
+                    results.append(e)
+        return results
+
+
+def _install(command):
+    """Private helper to generate the ``get_<name>`` and ``set_<name>``
+    coroutines of a registered command
+    """
+    cls = AsyncMultipleDisplayControl
+    if command.get:
+        async def get(self):
+            return await self._request(command, command.get_frame(self.id))
+
+        get.__name__ = f'get_{command.name}'
+        get.__qualname__ = f'{cls.__name__}.{get.__name__}'
+        get.__doc__ = command.doc('get')
+        setattr(cls, get.__name__, get)
+
+    if command.set:
+        async def set(self, *args):
+            return await self._request(command,
+                                       command.set_frame(self.id, *args))
+
+        set.__name__ = f'set_{command.name}'
+        set.__qualname__ = f'{cls.__name__}.{set.__name__}'
+        set.__doc__ = command.doc('set')
+        setattr(cls, set.__name__, set)
+
+
+for _command in COMMANDS.values():
+    _install(_command)
+_installers.append(_install)
@@ -0,0 +1,182 @@
+r"""
+
+:mod:`breaker` -- Circuit breaker
+=================================
+
+Per-host circuit breaker skipping unreachable displays
+
+"""
+
+# mandatory imports
+import errno
+import selectors
+import socket
+import threading
+import time
+
+
+__all__ = ['CircuitBreaker']
+
+
+# maximum number of probe connects in flight
+_max_probes = 256
+
+
+class CircuitBreaker(object):
+    """
+    """
+
+    __slots__ = (
+        "__threshold",
+        "__probe_interval",
+        "__probe_timeout",
+        "__failures",
+        "__open",
+        "__lock",
+        "__wakeup",
+        "__thread",
+        "__closed",
+    )
+
+    def __init__(self, threshold: int = None, probe_interval: float = None,
+                 probe_timeout: float = None):
+        """Construct a per-host circuit breaker.
+
+        A circuit opens after ``threshold`` consecutive connection failures
+        of a (host, port). While open, commands to that display fail fast
+        instead of waiting for the socket timeout. A background thread
+        probes the open circuits with a plain TCP connect and closes a
+        circuit as soon as the display accepts connections again. The
+        probes are connected concurrently, up to 256 at a time.
+
+        Parameters:
+        -----------
+        threshold : `int`, optional
+            Consecutive failures to open a circuit (default: 3).
+
+        probe_interval : `float`, optional
+            Seconds between probes of the open circuits (default: 5.).
+
+        probe_timeout : `float`, optional
+            Connect timeout of a probe, in seconds (default: 1.).
+
+        Example:
+        --------
+
+        >>> breaker = CircuitBreaker()
+        >>> if breaker.allow(('192.168.1.100', 1515)):
+                ...
+        """
+        self.__threshold = threshold or 3
+        if not isinstance(self.__threshold, int):
+            raise TypeError('threshold should be of type integer')
+        if self.__threshold < 1:
+            raise ValueError('threshold should be positive')
+        self.__probe_interval = float(probe_interval or 5.)
+        self.__probe_timeout = float(probe_timeout or 1.)
+
+        self.__failures = {}
+        self.__open = set()
+        self.__lock = threading.Lock()
+        self.__wakeup = threading.Event()
+        self.__thread = None
+        self.__closed = False
+
+    def __repr__(self):
+        """String representation of a CircuitBreaker object.
+        """
+        return 'CircuitBreaker(threshold={}, open={})'.format(
+            self.threshold, len(self.__open)
+        )
+
+    @property
+    def threshold(self):
+        return self.__threshold
+
+    @property
+    def open(self):
+        """Set of (host, port) with an open circuit"""
+        with self.__lock:
+            return set(self.__open)
+
+    def allow(self, address: tuple):
+        """Returns `True` if commands to ``address`` (host, port) are allowed.
+        """
+        return address not in self.__open
+
+    def success(self, address: tuple):
+        """Feed back a successful command.
+        """
+        with self.__lock:
+            self.__failures.pop(address, None)
+            self.__open.discard(address)
+
+    def failure(self, address: tuple):
+        """Feed back a connection failure or timeout.
+        """
+        with self.__lock:
+            failures = self.__failures.get(address, 0) + 1
+            self.__failures[address] = failures
+            if failures < self.__threshold or address in self.__open:
+                return
+            self.__open.add(address)
+            if self.__thread is None and not self.__closed:
+                self.__thread = threading.Thread(
+                    target=self._probe, daemon=True,
+                    name='samsung_mdc.breaker',
+                )
+                self.__thread.start()
+
+    def _probe(self):
+        """Private thread loop probing the open circuits.
+        """
+        while not self.__wakeup.wait(self.__probe_interval):
+            with self.__lock:
+                addresses = list(self.__open)
+                if not addresses:
+                    self.__thread = None
+                    return
+            self._connect(addresses)
+        with self.__lock:
+            self.__thread = None
+
+    def _connect(self, addresses: list):
+        """Private helper to probe addresses with concurrent non-blocking
+        connects, closing each circuit as soon as its connect succeeds.
+        """
+        for i in range(0, len(addresses), _max_probes):
+            if self.__closed:
+                break
+            with selectors.DefaultSelector() as selector:
+                for address in addresses[i:i + _max_probes]:
+                    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    sock.setblocking(False)
+                    try:
+                        error = sock.connect_ex(address)
+                    except OSError:
+                        error = -1
+                    if error in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                        selector.register(sock, selectors.EVENT_WRITE,
+                                          address)
+                    else:
+                        sock.close()
+                expires = time.monotonic() + self.__probe_timeout
+                while selector.get_map():
+                    remaining = expires - time.monotonic()
+                    if remaining <= 0.:
+                        break
+                    for key, events in selector.select(remaining):
+                        selector.unregister(key.fileobj)
+                        if not key.fileobj.getsockopt(socket.SOL_SOCKET,
+                                                      socket.SO_ERROR):
+                            self.success(key.data)
+                        key.fileobj.close()
+                # connects still pending at the timeout
+                for key in list(selector.get_map().values()):
+                    key.fileobj.close()
+
+    def close(self):
+        """Stop probing.
+        """
+        self.__closed = True
+        self.__wakeup.set()
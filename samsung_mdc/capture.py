@@ -0,0 +1,450 @@
+r"""
+
+:mod:`capture` -- Capture
+=========================
+
+Wire capture and deterministic replay of Samsung Multiple Display Control
+sessions
+
+"""
+
+# mandatory imports
+import socket
+import struct
+import threading
+import time
+import warnings
+from collections import namedtuple
+
+
+__all__ = ['Capture', 'CaptureFrame', 'read_capture', 'capture_streams',
+           'ReplayPanel', 'replay_client']
+
+
+# file header: magic, version, start time (ns since the epoch)
+_header = struct.Struct('<4sHxxq')
+_magic = b'MDCC'
+_version = 2
+
+# frame header: time since start (ns), direction, display host (ipv4),
+# port and id, payload length
+_frame = struct.Struct('<qB4sHBH')
+
+# frame header of version 1 without the display
+_frame_v1 = struct.Struct('<qBH')
+
+OUTBOUND = 0
+INBOUND = 1
+
+CaptureFrame = namedtuple('CaptureFrame', 'time direction data display')
+
+
+class Capture(object):
+    """
+    """
+
+    __slots__ = (
+        "__path",
+        "__file",
+        "__start",
+        "__frames",
+        "__lock",
+    )
+
+    def __init__(self, path: str):
+        """Open a binary wire capture file for writing.
+
+        Each frame is stored with a nanosecond timestamp relative to the
+        start of the capture, its direction, the (host, port, id) of its
+        display and its raw bytes. Pass the capture to one or more
+        :class:`MultipleDisplayControl` objects to record every frame sent
+        and received. The frames of each display form a separate stream, so
+        that a single stream can be replayed. Connections to the same host,
+        port and id are not told apart.
+
+        Parameters:
+        -----------
+        path : `str`
+            Capture file path. An existing file is overwritten.
+
+        Example:
+        --------
+
+        >>> with Capture('session.mdcc') as capture:
+                with MultipleDisplayControl('192.168.1.100',
+                                            capture=capture) as mdc:
+                    mdc.get_power()
+        >>> for frame in read_capture('session.mdcc'):
+                print(frame)
+        """
+        if not isinstance(path, str):
+            raise TypeError('path should be of type string')
+        self.__path = path
+        self.__frames = 0
+        self.__lock = threading.Lock()
+        self.__start = time.perf_counter_ns()
+        self.__file = open(path, 'wb')
+        self.__file.write(_header.pack(_magic, _version, time.time_ns()))
+
+    def __enter__(self):
+        """Enter a Capture object.
+        """
+        return self
+
+    def __exit__(self, *args):
+        """Exit the Capture object.
+        """
+        self.close()
+
+    def __repr__(self):
+        """String representation of a Capture object.
+        """
+        return 'Capture(path={}, frames={})'.format(self.path, self.frames)
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def frames(self):
+        return self.__frames
+
+    @property
+    def closed(self):
+        return self.__file.closed
+
+    def write(self, direction: int, data: bytes, display: tuple = None):
+        """Append a frame.
+
+        Parameters:
+        -----------
+        direction : `int`
+            ``0`` for outbound (client to display), ``1`` for inbound.
+
+        data : `bytes`
+            Raw frame bytes.
+
+        display : `tuple`, optional
+            The (host, port, id) of the display the frame belongs to.
+            Defaults to `None` for an unknown display.
+        """
+        ns = time.perf_counter_ns() - self.__start
+        if display is None:
+            host, port, id = bytes(4), 0, 0
+        else:
+            host, port, id = display
+            try:
+                host = socket.inet_aton(host)
+            except OSError:
+                raise ValueError('display host should be an ipv4-address')
+        with self.__lock:
+            if self.__file.closed:
+                return
+            self.__file.write(_frame.pack(ns, direction, host, port, id,
+                                          len(data)))
+            self.__file.write(data)
+            self.__frames += 1
+
+    def flush(self):
+        """Flush the capture file.
+        """
+        with self.__lock:
+            self.__file.flush()
+
+    def close(self):
+        """Close the capture file.
+        """
+        with self.__lock:
+            self.__file.close()
+
+
+def read_capture(path: str):
+    """Iterate over the frames of a capture file.
+
+    Parameters:
+    -----------
+    path : `str`
+        Capture file path.
+
+    Returns:
+    --------
+    frames : iterator of :class:`CaptureFrame`
+        Frames with the time in seconds since the start of the capture and
+        the (host, port, id) of the display, or `None` if unknown.
+    """
+    with open(path, 'rb') as f:
+        magic, version, start = _header.unpack(f.read(_header.size))
+        if magic != _magic or version not in (1, _version):
+            raise ValueError(f'{path} is not a valid capture file')
+        frame = _frame if version == _version else _frame_v1
+        while True:
+            head = f.read(frame.size)
+            if len(head) < frame.size:
+                break
+            if version == _version:
+                ns, direction, host, port, id, length = frame.unpack(head)
+                display = (socket.inet_ntoa(host), port, id) \
+                    if port else None
+            else:
+                ns, direction, length = frame.unpack(head)
+                display = None
+            data = f.read(length)
+            if len(data) < length:
+                break  # truncated by an interrupted capture
+            yield CaptureFrame(ns / 1e9, direction, data, display)
+
+
+def capture_streams(path: str):
+    """List the displays with a stream in a capture file.
+
+    Returns:
+    --------
+    displays : `list` of `tuple`
+        The (host, port, id) per stream in order of appearance, `None` for
+        frames of an unknown display.
+    """
+    return list(dict.fromkeys(frame.display for frame in read_capture(path)))
+
+
+def _exchanges(path: str, display: tuple = None):
+    """Private helper to group the frames of a single stream into
+    request/reply exchanges.
+    """
+    streams = capture_streams(path)
+    if display is None:
+        if len(streams) > 1:
+            raise ValueError(f'{path} holds {len(streams)} streams, select '
+                             'one with display')
+        display = streams[0] if streams else None
+    else:
+        display = tuple(display)
+        if display not in streams:
+            raise ValueError(f'{path} holds no stream of display {display}')
+    exchanges = []
+    for frame in read_capture(path):
+        if frame.display != display:
+            continue
+        if frame.direction == OUTBOUND:
+            exchanges.append((frame, []))
+        elif exchanges:
+            exchanges[-1][1].append(frame)
+    return exchanges
+
+
+def _sleep_until(start: float, offset: float, speed: float):
+    """Private helper to sleep until ``offset`` seconds after ``start``
+    scaled by ``speed``.
+    """
+    if not speed:
+        return
+    delay = start + offset / speed - time.monotonic()
+    if delay > 0.:
+        time.sleep(delay)
+
+
+class ReplayPanel(object):
+    """
+    """
+
+    __slots__ = (
+        "__exchanges",
+        "__speed",
+        "__server",
+        "__thread",
+        "__mismatches",
+        "__closing",
+        "__conn",
+    )
+
+    def __init__(self, path: str, host: str = None, port: int = None,
+                 speed: float = None, display: tuple = None):
+        """Replay the display side of a capture stream as a TCP server.
+
+        For each recorded request that is received, the recorded replies are
+        sent back after the recorded reply latency. Requests that differ
+        from the recording are counted as mismatches and replied to anyway,
+        keeping the replay deterministic.
+
+        Parameters:
+        -----------
+        path : `str`
+            Capture file path.
+
+        host : `str`, optional
+            Listen address (default: ``'127.0.0.1'``).
+
+        port : `int`, optional
+            Listen port. Defaults to 0 for any free port.
+
+        speed : `float`, optional
+            Speed factor of the recorded latencies (default: 1.). If 0,
+            replies are sent without delay.
+
+        display : `tuple`, optional
+            The (host, port, id) of the stream to replay, see
+            :func:`capture_streams`. Required if the capture holds more than
+            one stream.
+
+        Example:
+        --------
+
+        >>> with ReplayPanel('session.mdcc', speed=10.) as panel:
+                with MultipleDisplayControl('127.0.0.1', panel.port) as mdc:
+                    mdc.get_power()
+        """
+        self.__exchanges = _exchanges(path, display)
+        self.__speed = 1. if speed is None else float(speed)
+        if self.__speed < 0.:
+            raise ValueError('speed should be non-negative')
+        self.__mismatches = 0
+        self.__closing = False
+        self.__conn = None
+        self.__server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self.__server.bind((host or '127.0.0.1', port or 0))
+            self.__server.listen()
+        except OSError:
+            self.__server.close()
+            raise
+        self.__thread = threading.Thread(target=self._serve, daemon=True,
+                                         name='samsung_mdc.replay')
+        self.__thread.start()
+
+    def __enter__(self):
+        """Enter a ReplayPanel object.
+        """
+        return self
+
+    def __exit__(self, *args):
+        """Exit the ReplayPanel object.
+        """
+        self.close()
+
+    @property
+    def host(self):
+        return self.__server.getsockname()[0]
+
+    @property
+    def port(self):
+        return self.__server.getsockname()[1]
+
+    @property
+    def speed(self):
+        return self.__speed
+
+    @property
+    def mismatches(self):
+        """Number of received requests that differ from the recording"""
+        return self.__mismatches
+
+    def _serve(self):
+        """Private server loop replaying the capture per connection.
+        """
+        while not self.__closing:
+            try:
+                conn, address = self.__server.accept()
+            except OSError:
+                break
+            self.__conn = conn
+            with conn:
+                self._replay(conn)
+            self.__conn = None
+
+    def _replay(self, conn):
+        """Private helper to replay all exchanges on a connection.
+        """
+        buffer = b''
+        for request, replies in self.__exchanges:
+            while len(buffer) < len(request.data):
+                try:
+                    data = conn.recv(4096)
+                except OSError:
+                    return
+                if not data:
+                    return
+                buffer += data
+            received = time.monotonic()
+            if buffer[:len(request.data)] != request.data:
+                self.__mismatches += 1
+            buffer = buffer[len(request.data):]
+            for reply in replies:
+                _sleep_until(received, reply.time - request.time, self.__speed)
+                try:
+                    conn.sendall(reply.data)
+                except OSError:
+                    return
+
+    def close(self):
+        """Stop the server.
+        """
+        self.__closing = True
+        # wake the server thread blocked in accept or recv
+        for sock in (self.__server, self.__conn):
+            if sock is None:
+                continue
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.__thread.join(timeout=1.)
+        self.__server.close()
+
+
+def replay_client(path: str, mdc, speed: float = None,
+                  display: tuple = None):
+    """Replay the client side of a capture stream on a connected display.
+
+    The recorded requests are sent at their recorded times, scaled by
+    ``speed``, and the reply frames are read back until as many bytes as
+    recorded have arrived.
+
+    Parameters:
+    -----------
+    path : `str`
+        Capture file path.
+
+    mdc : :class:`MultipleDisplayControl`
+        Connected display to send the requests to.
+
+    speed : `float`, optional
+        Speed factor of the recorded timing (default: 1.). If 0, requests
+        are sent back-to-back.
+
+    display : `tuple`, optional
+        The (host, port, id) of the stream to replay. Defaults to the stream
+        of ``mdc`` if the capture holds more than one stream.
+
+    Returns:
+    --------
+    results : `list` of `tuple`
+        The (request, recorded reply, received reply) per exchange. The
+        replies are `None` if none was recorded or received.
+    """
+    speed = 1. if speed is None else float(speed)
+    if speed < 0.:
+        raise ValueError('speed should be non-negative')
+    if display is None and len(capture_streams(path)) > 1:
+        display = (mdc.host, mdc.port, mdc.id)
+    exchanges = _exchanges(path, display)
+    results = []
+    if not exchanges:
+        return results
+    start, first = time.monotonic(), exchanges[0][0].time
+    for request, replies in exchanges:
+        _sleep_until(start, request.time - first, speed)
+        mdc._write(request.data)
+        expected = b''.join(reply.data for reply in replies) or None
+        received = None
+        if expected is not None:
+            received = b''
+            try:
+                while len(received) < len(expected):
+                    received += mdc._read_frame()
+            except socket.timeout:
+                warnings.warn('{} reply to {}'.format(
+                    'incomplete' if received else 'no', request.data.hex()
+                ))
+            received = received or None
+        results.append((request.data, expected, received))
+    return results
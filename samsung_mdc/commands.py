@@ -0,0 +1,440 @@
+r"""
+
+:mod:`commands` -- Commands
+===========================
+
+Declarative registry of the Samsung Multiple Display Control commands
+
+Each command declares its code, data fields, value ranges and enum tables
+once. Specialized encoders and decoders are built from these declarations at
+registration, and the synchronous, asynchronous and batch interfaces are
+generated from the registry.
+
+"""
+
+# mandatory imports
+from collections import OrderedDict
+
+# relative imports
+from .util import parse_reply, verify_key_value
+
+
+__all__ = ['Command', 'Bool', 'Int', 'Enum', 'Text', 'COMMANDS', 'CODES',
+           'register', 'lookup']
+
+
+# registered commands by name and by code
+COMMANDS = OrderedDict()
+CODES = {}
+
+# callables generating the interfaces of a newly registered command
+_installers = []
+
+
+class Bool(object):
+    """Boolean data field, e.g. on/off.
+    """
+
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def describe(self):
+        return '`bool` or `int`', ''
+
+    def encode(self, value):
+        if not isinstance(value, (bool, int)):
+            raise TypeError(f'{self.name} should be of type bool or int')
+        return 1 if value else 0
+
+    def decode(self, value: int):
+        return bool(value)
+
+    def raw(self, value):
+        return int(value)
+
+
+class Int(object):
+    """Integer data field within a range.
+    """
+
+    __slots__ = ('name', 'lo', 'hi')
+
+    def __init__(self, name: str, lo: int = 0, hi: int = 255):
+        self.name = name
+        self.lo = lo
+        self.hi = hi
+
+    def describe(self):
+        return '`int`', f'[{self.lo}, {self.hi}]'
+
+    def encode(self, value):
+        if not isinstance(value, int):
+            raise TypeError(f'{self.name} should be of type integer')
+        if value < self.lo or value > self.hi:
+            raise ValueError(f'{self.name} should be within '
+                             f'[{self.lo}, {self.hi}]')
+        return int(value)
+
+    def decode(self, value: int):
+        return value
+
+    def raw(self, value):
+        return value
+
+
+class Enum(object):
+    """Enumerated data field with a table of integer keys and names.
+    """
+
+    __slots__ = ('name', 'table', 'table_get', 'keys')
+
+    def __init__(self, name: str, table: dict, table_get: dict = None):
+        self.name = name
+        self.table = table
+        self.table_get = table_get or table
+        self.keys = {val: key for key, val in self.table_get.items()}
+
+    def describe(self):
+        return '`int` or `str`', ', '.join(
+            f'0x{key:02X}: {val}' for key, val in self.table.items()
+        )
+
+    def encode(self, value):
+        return verify_key_value(value, self.table, self.name)
+
+    def decode(self, value: int):
+        # unknown keys are returned as is
+        return self.table_get.get(value, value)
+
+    def raw(self, value):
+        # the inverse of decode, including view only and unknown keys
+        return value if isinstance(value, int) else self.keys[value]
+
+
+class Text(object):
+    """Ascii text data field, view only.
+    """
+
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def describe(self):
+        return '`str`', ''
+
+    def encode(self, value):
+        raise TypeError(f'{self.name} is view only')
+
+    def decode(self, values: tuple):
+        return bytes(values).split(b'\x00')[0].decode('ascii', 'replace')
+
+
+class Command(object):
+    """
+    """
+
+    __slots__ = (
+        "name",
+        "code",
+        "fields",
+        "get",
+        "set",
+        "title",
+        "encode",
+        "decode",
+        "raw",
+        "_get_frames",
+    )
+
+    def __init__(self, name: str, code: int, fields: tuple,
+                 title: str = None, get: bool = True, set: bool = True,
+                 encode=None, decode=None, raw=None):
+        """Declare a Samsung Multiple Display Control command.
+
+        Parameters:
+        -----------
+        name : `str`
+            Command name, used for the ``get_<name>`` and ``set_<name>``
+            methods and the ``<name>`` property.
+
+        code : `int`
+            Command code [0, 255].
+
+        fields : `tuple`
+            Data fields of type :class:`Bool`, :class:`Int`, :class:`Enum` or
+            :class:`Text`, in frame order.
+
+        title : `str`, optional
+            Human readable title. Defaults to the name.
+
+        get : `bool`, optional
+            The command can be viewed (default: `True`).
+
+        set : `bool`, optional
+            The command can be controlled (default: `True`).
+
+        encode : `callable`, optional
+            Custom encoder of the setter arguments to a list of data bytes.
+
+        decode : `callable`, optional
+            Custom decoder of the reply data bytes to a value.
+
+        raw : `callable`, optional
+            Custom inverse of ``decode``, converting a value back to the
+            list of reply data bytes. Required for a custom ``decode`` to
+            support :meth:`History.feed`.
+        """
+        if not isinstance(code, int) or code < 0 or code > 255:
+            raise ValueError('code should be within [0, 255]')
+        self.name = name
+        self.code = code
+        self.fields = tuple(fields)
+        self.title = title or name.replace('_', ' ')
+        self.get = get
+        self.set = set and not any(isinstance(f, Text) for f in self.fields)
+        self.encode = encode or self._encoder()
+        self.decode = decode or self._decoder()
+        # text has no integer representation
+        self.raw = raw or (None if decode is not None or any(
+            isinstance(f, Text) for f in self.fields
+        ) else self._rawer())
+        self._get_frames = {}
+
+    def __repr__(self):
+        """String representation of a Command object.
+        """
+        return 'Command(name={}, code=0x{:02X})'.format(self.name, self.code)
+
+    def _encoder(self):
+        """Private helper to build the encoder specialized on the fields.
+        """
+        fields = self.fields
+        name = self.name
+        if len(fields) == 1:
+            field = fields[0]
+
+            def encode(*args):
+                if len(args) != 1:
+                    raise TypeError(f'{name} takes a single value')
+                return [field.encode(args[0])]
+        else:
+            def encode(*args):
+                if len(args) != len(fields):
+                    raise TypeError(f'{name} takes {len(fields)} values')
+                return [f.encode(arg) for f, arg in zip(fields, args)]
+        return encode
+
+    def _decoder(self):
+        """Private helper to build the decoder specialized on the fields.
+        """
+        fields = self.fields
+        if len(fields) == 1:
+            field = fields[0]
+            if isinstance(field, Text):
+                return field.decode
+
+            def decode(values):
+                return field.decode(values[0]) if values else None
+        else:
+            def decode(values):
+                return tuple(f.decode(v) for f, v in zip(fields, values))
+        return decode
+
+    def _rawer(self):
+        """Private helper to build the inverse of the decoder.
+        """
+        fields = self.fields
+        if len(fields) == 1:
+            field = fields[0]
+
+            def raw(value):
+                return [field.raw(value)]
+        else:
+            def raw(value):
+                return [f.raw(v) for f, v in zip(fields, value)]
+        return raw
+
+    def get_frame(self, id: int):
+        """View control state frame for display ``id``.
+        """
+        frame = self._get_frames.get(id)
+        if frame is None:
+            frame = _frame([0xAA, self.code, id, 0])
+            self._get_frames[id] = frame
+        return frame
+
+    def set_frame(self, id: int, *args):
+        """Controlling frame for display ``id`` with the encoded ``args``.
+        """
+        if not self.set:
+            raise TypeError(f'{self.name} is view only')
+        data = self.encode(*args)
+        return _frame([0xAA, self.code, id, len(data)] + data)
+
+    def parse(self, frame: bytes):
+        """Decode the value of a reply frame.
+
+        Raises:
+        ------
+        RuntimeError
+            When the display replied with a NAK.
+
+        ValueError
+            When the frame is not a reply to this command.
+        """
+        ack, code, values = parse_reply(frame)
+        if code != self.code:
+            raise ValueError(f'reply to command 0x{code:02X} instead of '
+                             f'0x{self.code:02X}')
+        if not ack:
+            raise RuntimeError(
+                f'{self.name} not acknowledged (error code '
+                f'{values[0] if values else None})'
+            )
+        return self.decode(values)
+
+    def doc(self, action: str):
+        """Docstring of the generated ``get`` or ``set`` method.
+        """
+        lines = [f'{"View" if action == "get" else "Control"} the '
+                 f'{self.title} (0x{self.code:02X}).', '']
+        lines += (['Returns:', '--------'] if action == 'get'
+                  else ['Parameters:', '-----------'])
+        for field in self.fields:
+            kind, values = field.describe()
+            lines.append(f'{field.name}: {kind}')
+            if values:
+                lines.append(f'    {values}')
+        return '\n'.join(lines)
+
+
+def _frame(command: list):
+    """Private helper to append the checksum to a frame.
+    """
+    return bytes(command) + bytes([sum(command[1:]) % 256])
+
+
+def register(command: Command):
+    """Add a command to the registry.
+
+    The ``get_<name>`` and ``set_<name>`` methods of the synchronous and
+    asynchronous interfaces are generated, and the command is available by
+    name to :class:`Fleet` and the batch interfaces.
+    """
+    if not isinstance(command, Command):
+        raise TypeError('command should be of type Command')
+    COMMANDS[command.name] = command
+    CODES[command.code] = command
+    for install in _installers:
+        install(command)
+    return command
+
+
+def lookup(method: str):
+    """Get the command and action of a ``get_<name>`` or ``set_<name>``
+    method name.
+
+    Returns:
+    --------
+    command : :class:`Command`
+
+    action : `str`
+        Either ``'get'`` or ``'set'``.
+    """
+    action, _, name = method.partition('_')
+    command = COMMANDS.get(name)
+    if action not in ('get', 'set') or command is None or \
+            not getattr(command, action):
+        raise ValueError(f'"{method}" is not a command method')
+    return command, action
+
+
+# input sources
+_input_sources_set = {
+    0x0C: 'Input source',
+    0x18: 'DVI',
+    0x20: 'MagicInfo',
+    0x21: 'HDMI1',
+    0x23: 'HDMI2',
+    0x25: 'DisplayPort'
+}
+
+_input_sources_get = {
+    **_input_sources_set,
+    0x1F: 'DVI_video',
+    0x22: 'HDMI1_PC',
+    0x24: 'HDMI2_PC',
+}
+
+_video_wall_modes = {
+    0x00: 'Natural',
+    0x01: 'Full',
+}
+
+
+def _encode_video_wall_user(col: int, row: int = None, pos: int = None):
+    """Private helper to encode the video wall user control.
+    """
+    row = row or col
+    if not isinstance(col, int) or not isinstance(row, int):
+        raise TypeError('col and row should be of type integer')
+    screens = col * row
+    if col < 0 or col > 15 or row < 0 or row > 15 or screens > 100:
+        raise ValueError('col and row should be within [0, 15] '
+                         'with total number of screens <= 100')
+    if screens == 0:
+        return [0x00, 0x00]
+    if not isinstance(pos, int):
+        raise TypeError('pos should be of type integer')
+    if pos < 1 or pos > screens:
+        raise ValueError(f'pos should be within [1, {screens}]')
+    return [(row << 4) | col, pos]
+
+
+def _decode_video_wall_user(values: tuple):
+    """Private helper to decode the video wall user control.
+    """
+    if len(values) < 2:
+        return None
+    return values[0] & 0x0F, values[0] >> 4, values[1]
+
+
+def _raw_video_wall_user(value: tuple):
+    """Private helper to convert a decoded video wall user control back to
+    its data bytes.
+    """
+    col, row, pos = value
+    return [(row << 4) | col, pos]
+
+
+register(Command('serial_number', 0x0B, (Text('serial_number'),),
+                 set=False))
+register(Command('software_version', 0x0E, (Text('software_version'),),
+                 set=False))
+register(Command('power', 0x11, (Bool('power'),), 'power state'))
+register(Command('volume', 0x12, (Int('volume', 0, 100),)))
+register(Command('mute', 0x13, (Bool('mute'),), 'mute state'))
+register(Command('source', 0x14, (Enum('source', _input_sources_set,
+                                       _input_sources_get),)))
+register(Command('screen_size', 0x19, (Int('screen_size', 0, 255),)))
+register(Command('contrast', 0x24, (Int('contrast', 0, 100),)))
+register(Command('brightness', 0x25, (Int('brightness', 0, 100),)))
+register(Command('sharpness', 0x26, (Int('sharpness', 0, 100),)))
+register(Command('color', 0x27, (Int('color', 0, 100),)))
+register(Command('tint', 0x28, (Int('tint', 0, 100),)))
+register(Command('video_wall_mode', 0x5C,
+                 (Enum('video_wall_mode', _video_wall_modes),)))
+register(Command('safety_lock', 0x5D, (Bool('safety_lock'),),
+                 'safety lock state'))
+register(Command('video_wall_on', 0x84, (Bool('video_wall_on'),),
+                 'video wall on state'))
+register(Command('video_wall_user', 0x89,
+                 (Int('col', 0, 15), Int('row', 0, 15), Int('pos', 1, 100)),
+                 'video wall user control',
+                 encode=_encode_video_wall_user,
+                 decode=_decode_video_wall_user,
+                 raw=_raw_video_wall_user))
+register(Command('model_name', 0x8A, (Text('model_name'),), set=False))
@@ -0,0 +1,536 @@
+r"""
+
+:mod:`fleet` -- Fleet
+=====================
+
+Samsung Multiple Display Control operations on a fleet of displays
+
+"""
+
+# mandatory imports
+import itertools
+import multiprocessing
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import Future
+
+# relative imports
+from .breaker import CircuitBreaker
+from .mdc import MultipleDisplayControl
+from .pacing import Pacer
+from .scheduler import DeadlineExceeded, Scheduler
+from .util import is_valid_ipv4_address
+
+
+__all__ = ['Fleet', 'FleetResult']
+
+
+FleetResult = namedtuple('FleetResult', 'index display value error')
+
+
+def _display_spec(display):
+    """Private helper to convert a display to a (host, port, id) tuple.
+    """
+    if isinstance(display, MultipleDisplayControl):
+        return display.host, display.port, display.id
+    if isinstance(display, str):
+        display = (display,)
+    if not isinstance(display, (tuple, list)) or not 1 <= len(display) <= 3:
+        raise TypeError('display should be a MultipleDisplayControl object, '
+                        'a host string or a (host, port, id) tuple')
+    host, port, id = (tuple(display) + (None, None))[:3]
+    # validate and apply the defaults of MultipleDisplayControl, without
+    # creating its socket
+    if not isinstance(host, str):
+        raise TypeError('host should be of type string')
+    if not is_valid_ipv4_address(host):
+        raise ValueError('host is not a valid ipv4 address')
+    port = port or 1515
+    if not isinstance(port, int):
+        raise TypeError('port should be of type integer')
+    if port < 0 or port > 65535:
+        raise ValueError('port should be within [0, 65535]')
+    id = id or 254
+    if not isinstance(id, int):
+        raise TypeError('id should be of type integer')
+    if id < 0 or id > 255:
+        raise ValueError('id should be within [0, 255]')
+    return host, port, id
+
+
+class _Shard(object):
+    """Private set of displays with a persistent, scheduled connection per
+    (host, port), shared by daisy-chained displays.
+    """
+
+    __slots__ = ('displays', 'timeout', 'pacer', 'breaker', 'schedulers',
+                 'lock')
+
+    def __init__(self, displays: list, timeout: float = None,
+                 pacer: bool = False, breaker: bool = True):
+        self.displays = displays  # list of (index, (host, port, id))
+        self.timeout = timeout
+        self.pacer = pacer
+        # the breaker tracks the failures of each (host, port) separately
+        self.breaker = CircuitBreaker() if breaker else None
+        self.schedulers = {}
+        self.lock = threading.Lock()
+
+    def scheduler(self, spec: tuple):
+        """Get the scheduler of the connection of a display, creating it.
+        """
+        with self.lock:
+            scheduler = self.schedulers.get(spec[:2])
+            if scheduler is None:
+                host, port, id = spec
+                scheduler = Scheduler(MultipleDisplayControl(
+                    host, port, id, timeout=self.timeout,
+                    pacer=Pacer() if self.pacer else None,
+                ))
+                self.schedulers[spec[:2]] = scheduler
+            return scheduler
+
+    def run(self, method: str, args: tuple, priority: int = None,
+            deadline: float = None, retries: int = None,
+            indices: frozenset = None):
+        """Call a method on all displays, or on those in ``indices``.
+        Returns a list of (index, value, error) tuples.
+        """
+        displays = self.displays if indices is None else [
+            (index, spec) for index, spec in self.displays if index in indices
+        ]
+        expires = None if deadline is None else time.monotonic() + deadline
+        if retries is None:
+            retries = 0 if deadline is None else 1
+        results = {}
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def finish(index, value, error):
+            with lock:
+                results[index] = (index, value, error)
+                if len(results) == len(displays):
+                    done.set()
+
+        def submit(index, spec, attempt):
+            address = spec[:2]
+            if self.breaker is not None and not self.breaker.allow(address):
+                finish(index, None, 'CircuitOpen: display is unreachable')
+                return
+            try:
+                future = self.scheduler(spec).submit(
+                    method, *args, priority=priority, deadline=expires,
+                    id=spec[2],
+                )
+            except Exception as e:
+                finish(index, None, f'{type(e).__name__}: {e}')
+                return
+            start = time.monotonic()
+            future.add_done_callback(
+                lambda future: complete(index, spec, attempt, start, future)
+            )
+
+        def complete(index, spec, attempt, start, future):
+            address = spec[:2]
+            if future.cancelled():
+                finish(index, None, 'CancelledError: request shed')
+                return
+            error = future.exception()
+            if error is None:
+                if self.breaker is not None:
+                    self.breaker.success(address)
+                finish(index, future.result(), None)
+                return
+            if isinstance(error, DeadlineExceeded):
+                # the budget ran out, which says nothing about the display
+                finish(index, None, 'TimeoutError: deadline exceeded')
+                return
+            if isinstance(error, OSError):
+                if self.breaker is not None:
+                    self.breaker.failure(address)
+                # retry only if the budget allows another attempt as long
+                now = time.monotonic()
+                if attempt < retries and (
+                    expires is None or expires - now > now - start
+                ):
+                    submit(index, spec, attempt + 1)
+                    return
+            finish(index, None, f'{type(error).__name__}: {error}')
+
+        if not displays:
+            return []
+        for index, spec in displays:
+            submit(index, spec, 0)
+        done.wait(None if expires is None
+                  else max(0., expires - time.monotonic()))
+        with lock:
+            # displays still pending at the deadline are reported as timed out
+            for index, spec in displays:
+                results.setdefault(
+                    index, (index, None, 'TimeoutError: deadline exceeded')
+                )
+            return [results[index] for index, spec in displays]
+
+    def close(self):
+        with self.lock:
+            schedulers = list(self.schedulers.values())
+            self.schedulers.clear()
+        for scheduler in schedulers:
+            scheduler.close()
+        if self.breaker is not None:
+            self.breaker.close()
+
+
+def _serve(conn, displays, timeout, pacer, breaker):
+    """Private worker process loop serving shard tasks over a pipe.
+    """
+    shard = _Shard(displays, timeout, pacer, breaker)
+    lock = threading.Lock()
+
+    def run(task_id, *task):
+        # one compact batch of tuples per task
+        batch = shard.run(*task)
+        with lock:
+            conn.send((task_id, batch))
+
+    try:
+        while True:
+            task = conn.recv()
+            if task is None:
+                break
+            # tasks run concurrently so that priority lanes can preempt
+            threading.Thread(target=run, args=task, daemon=True).start()
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        shard.close()
+        conn.close()
+
+
+class _Worker(object):
+    """Private parent side of a worker process serving a shard.
+    """
+
+    __slots__ = ('displays', 'options', 'conn', 'process', 'lock', 'futures',
+                 'tasks', 'reader', 'exited')
+
+    def __init__(self, displays: list, timeout: float = None,
+                 pacer: bool = False, breaker: bool = True):
+        self.displays = displays
+        self.options = (timeout, pacer, breaker)
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_serve, daemon=True, args=(child, displays, *self.options),
+        )
+        self.process.start()
+        child.close()
+        self.lock = threading.Lock()
+        self.futures = {}
+        self.tasks = itertools.count()
+        self.exited = False
+        self.reader = threading.Thread(target=self.read, daemon=True)
+        self.reader.start()
+
+    @property
+    def alive(self):
+        return not self.exited and self.process.is_alive()
+
+    def read(self):
+        """Dispatch the batches returned by the worker process.
+        """
+        try:
+            while True:
+                task_id, batch = self.conn.recv()
+                with self.lock:
+                    future = self.futures.pop(task_id)
+                future.set_result(batch)
+        except (EOFError, OSError):
+            pass
+        with self.lock:
+            self.exited = True
+            futures = list(self.futures.values())
+            self.futures.clear()
+        for future in futures:
+            future.set_exception(ConnectionError('worker process exited'))
+
+    def submit(self, *task):
+        future = Future()
+        with self.lock:
+            if self.exited:
+                future.set_exception(
+                    ConnectionError('worker process exited')
+                )
+                return future
+            task_id = next(self.tasks)
+            self.futures[task_id] = future
+            try:
+                self.conn.send((task_id, *task))
+            except OSError as e:
+                del self.futures[task_id]
+                future.set_exception(e)
+        return future
+
+    def restart(self):
+        """Close the worker and start a new one serving the same displays.
+        """
+        self.close()
+        return _Worker(self.displays, *self.options)
+
+    def close(self):
+        try:
+            with self.lock:
+                self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5.)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self.reader.join(timeout=1.)
+
+
+class Fleet(object):
+    """
+    """
+
+    __slots__ = (
+        "__displays",
+        "__processes",
+        "__timeout",
+        "__pacer",
+        "__breaker",
+        "__shards",
+        "__lock",
+    )
+
+    def __init__(self, displays, processes: int = None,
+                 timeout: float = None, pacer: bool = False,
+                 breaker: bool = True):
+        """Construct a fleet of Samsung Multiple Display Control displays.
+
+        Operations are executed on all displays concurrently over persistent
+        connections, each with a :class:`Scheduler` serving the commands by
+        priority. Daisy-chained displays with the same host and port share a
+        single connection and are addressed by their id. By default the
+        connections live in the current process.
+        With ``processes``, the displays are sharded by host across worker
+        processes. Each worker keeps its own persistent connections and
+        returns the results of an operation as a single batch.
+
+        Parameters:
+        -----------
+        displays : `list`
+            Displays as :class:`MultipleDisplayControl` objects, host strings
+            or (host, port, id) tuples.
+
+        processes : `int`, optional
+            Number of worker processes. Defaults to `None` to execute in the
+            current process. If 0, one process per cpu core is used.
+
+        timeout : `float`, optional
+            Socket timeout of each connection, in seconds (default: 5.).
+
+        pacer : `bool`, optional
+            Adaptively pace the commands of each connection (default: False).
+
+        breaker : `bool`, optional
+            Skip displays after repeated connection failures until a
+            background probe reaches them again, see :class:`CircuitBreaker`
+            (default: True).
+
+        Example:
+        --------
+
+        >>> with Fleet(['192.168.1.100', '192.168.1.101'], processes=0) as f:
+                for result in f.run('set_power', True):
+                    print(result)
+        """
+        self.__displays = [_display_spec(display) for display in displays]
+
+        if processes == 0:
+            processes = multiprocessing.cpu_count()
+        if processes is not None:
+            if not isinstance(processes, int):
+                raise TypeError('processes should be of type integer')
+            if processes < 0:
+                raise ValueError('processes should be non-negative')
+        self.__processes = processes
+
+        self.__timeout = timeout
+        self.__pacer = bool(pacer)
+        self.__breaker = bool(breaker)
+        self.__shards = None
+        self.__lock = threading.Lock()
+
+    def __del__(self):
+        """Destruct the Fleet object.
+        """
+        try:
+            self.close()
+        except AttributeError:
+            pass
+
+    def __enter__(self):
+        """Enter a Fleet object.
+        """
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        """Exit the Fleet object.
+        """
+        self.close()
+
+    def __len__(self):
+        """Number of displays.
+        """
+        return len(self.__displays)
+
+    def __iter__(self):
+        """Iterate over the (host, port, id) of each display.
+        """
+        return iter(self.__displays)
+
+    def __repr__(self):
+        """String representation of a Fleet object.
+        """
+        return 'Fleet(displays={}, processes={})'.format(
+            len(self), self.processes
+        )
+
+    @property
+    def displays(self):
+        """List of (host, port, id) of each display"""
+        return list(self.__displays)
+
+    @property
+    def processes(self):
+        return self.__processes
+
+    @property
+    def timeout(self):
+        return self.__timeout
+
+    def _shard(self, processes: int):
+        """Private helper to split the display indices by host.
+        """
+        shards = [[] for i in range(processes)]
+        for index, spec in enumerate(self.__displays):
+            # stable across processes, unlike hash()
+            shards[zlib.crc32(spec[0].encode()) % processes].append(
+                (index, spec)
+            )
+        return [shard for shard in shards if shard]
+
+    def open(self):
+        """Start the worker processes, if any.
+        """
+        with self.__lock:
+            if self.__shards is not None:
+                return
+            if self.__processes is None:
+                self.__shards = [_Shard(list(enumerate(self.__displays)),
+                                        self.__timeout, self.__pacer,
+                                        self.__breaker)]
+                return
+            self.__shards = [_Worker(displays, self.__timeout, self.__pacer,
+                                     self.__breaker)
+                             for displays in self._shard(self.__processes)]
+
+    def close(self):
+        """Close all connections and stop the worker processes.
+        """
+        with self.__lock:
+            shards, self.__shards = self.__shards, None
+        for shard in shards or ():
+            shard.close()
+
+    def _workers(self):
+        """Private helper to get the worker processes, restarting the dead.
+        """
+        with self.__lock:
+            for i, worker in enumerate(self.__shards):
+                if not worker.alive:
+                    self.__shards[i] = worker.restart()
+            return list(self.__shards)
+
+    def run(self, method: str, *args, priority: int = None,
+            deadline: float = None, retries: int = None, indices=None):
+        """Call a method of :class:`MultipleDisplayControl` on all displays,
+        or on a subset.
+
+        Parameters:
+        -----------
+        method : `str`
+            Method name, e.g. ``'get_power'`` or ``'set_source'``.
+
+        *args :
+            Arguments passed to the method.
+
+        priority : `int`, optional
+            Priority lane :data:`~samsung_mdc.scheduler.INTERACTIVE`,
+            :data:`~samsung_mdc.scheduler.AUTOMATION` (default) or
+            :data:`~samsung_mdc.scheduler.POLL`. Interactive operations
+            preempt queued poll requests on each connection.
+
+        deadline : `float`, optional
+            Overall time budget in seconds. The connect, send and receive of
+            each display are bounded by the remaining budget and displays
+            without a result at the deadline report a timeout. Defaults to
+            `None` (bounded by the socket timeouts only).
+
+        retries : `int`, optional
+            Number of retries after a connection failure or timeout. A retry
+            is only made if the remaining budget exceeds the duration of the
+            failed attempt. Defaults to 1 with a deadline, otherwise 0.
+
+        indices : `list`, optional
+            Indices of the displays to call, e.g. from
+            :meth:`Inventory.indices`. Defaults to all displays.
+
+        Returns:
+        --------
+        results : `list` of :class:`FleetResult`
+            Result per (selected) display in the order of the fleet, with
+            either the returned ``value`` or the ``error`` message set.
+        """
+        if not isinstance(method, str):
+            raise TypeError('method should be of type string')
+        if not callable(getattr(MultipleDisplayControl, method, None)):
+            raise ValueError(f'"{method}" is not a method of '
+                             'MultipleDisplayControl')
+        if indices is not None:
+            indices = frozenset(indices)
+            if not all(isinstance(index, int) for index in indices):
+                raise TypeError('indices should be of type integer')
+            if indices and (min(indices) < 0 or
+                            max(indices) >= len(self.__displays)):
+                raise ValueError('indices should be within '
+                                 f'[0, {len(self.__displays) - 1}]')
+        self.open()
+        task = (method, args, priority, deadline, retries, indices)
+        if self.__processes is None:
+            batches = [self.__shards[0].run(*task)]
+        else:
+            futures = [(worker, worker.submit(*task))
+                       for worker in self._workers()]
+            batches = []
+            for worker, future in futures:
+                try:
+                    batches.append(future.result())
+                except OSError as e:
+                    # the worker died, it is restarted by the next run
+                    error = f'{type(e).__name__}: {e}'
+                    batches.append([
+                        (index, None, error) for index, spec in worker.displays
+                        if indices is None or index in indices
+                    ])
+        results = [None] * len(self.__displays)
+        for batch in batches:
+            for index, value, error in batch:
+                results[index] = FleetResult(
+                    index, self.__displays[index], value, error
+                )
+        return [result for result in results if result is not None]
@@ -0,0 +1,610 @@
+r"""
+
+:mod:`gateway` -- Gateway
+=========================
+
+HTTP/JSON gateway to a fleet of Samsung Multiple Display Control displays
+
+"""
+
+# mandatory imports
+import argparse
+import asyncio
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+# relative imports
+from .commands import COMMANDS, lookup
+from .fleet import FleetResult
+from .inventory import Inventory
+from .scheduler import INTERACTIVE, AUTOMATION, POLL
+
+
+__all__ = ['Gateway']
+
+
+_priorities = {
+    'interactive': INTERACTIVE,
+    'automation': AUTOMATION,
+    'poll': POLL,
+}
+
+# largest accepted request body, in bytes
+_max_body = 1048576
+
+# maximum number of concurrent chunks of a request, so that a single request
+# does not occupy every executor thread
+_max_chunks = 8
+
+
+def _dumps(obj):
+    """Private helper to encode an object as a compact JSON line.
+    """
+    return json.dumps(obj, separators=(',', ':'), default=str).encode()
+
+
+def _result(result):
+    """Private helper to convert a :class:`FleetResult` to a dictionary.
+    """
+    return {
+        'index': result.index,
+        'display': list(result.display),
+        'value': result.value,
+        'error': result.error,
+    }
+
+
+def _status(names):
+    """Private helper to convert the :class:`FleetResult` of a batch of
+    getters to a dictionary.
+    """
+    def convert(result):
+        status, errors = {}, {}
+        for name, value in zip(names, result.value or ()):
+            if isinstance(value, Exception):
+                status[name] = None
+                errors[name] = f'{type(value).__name__}: {value}'
+            else:
+                status[name] = value
+        return {
+            'index': result.index,
+            'display': list(result.display),
+            'status': status,
+            'errors': errors,
+            'error': result.error,
+        }
+    return convert
+
+
+class Gateway(object):
+    """
+    """
+
+    __slots__ = (
+        "__inventory",
+        "__fleet",
+        "__host",
+        "__port",
+        "__chunk",
+        "__server",
+        "__executor",
+        "__clients",
+        "__routes",
+    )
+
+    def __init__(self, inventory, host: str = None, port: int = None,
+                 chunk: int = None, **kwargs):
+        """Construct an asyncio HTTP/JSON gateway to an inventory of displays.
+
+        All displays share a single :class:`Fleet` with persistent
+        connections, so that one request drives hundreds of displays over
+        reused connections. Selected displays are called in chunks that run
+        concurrently and streamed responses are sent as newline delimited
+        JSON (NDJSON) as soon as a chunk completes. The deadline of a
+        request is shared by all its chunks.
+
+        Endpoints:
+
+        ``GET /commands``
+            Registered commands.
+
+        ``GET /displays?selector=..``
+            Display entries of a selector.
+
+        ``GET /status?selector=..&commands=power,source&stream=1``
+            Status snapshot of the selected displays. The getters are
+            pipelined over the connection of each display.
+
+        ``POST /commands?stream=1``
+            Call one method on the selected displays, with a JSON body
+            ``{"selector": .., "method": .., "args": [..], "priority": ..,
+            "deadline": .., "retries": ..}``. Use ``"indices"`` instead of
+            ``"selector"`` to select the displays by index.
+
+        Responses are streamed with ``stream=1`` or an ``Accept:
+        application/x-ndjson`` request header.
+
+        Parameters:
+        -----------
+        inventory : :class:`Inventory`
+            Inventory of the displays.
+
+        host : `str`, optional
+            Interface to listen on (default: '127.0.0.1').
+
+        port : `int`, optional
+            Port to listen on (default: 8080). If 0, a free port is used.
+
+        chunk : `int`, optional
+            Number of displays per concurrent chunk (default: 64). Larger
+            selections use larger chunks, so that a request runs at most 8
+            chunks at a time.
+
+        **kwargs :
+            Passed to :class:`Fleet`, e.g. ``processes`` or ``timeout``.
+
+        Example:
+        --------
+
+        >>> gateway = Gateway(Inventory.load('displays.json'), port=8080)
+        >>> asyncio.run(gateway.serve_forever())
+
+        .. code-block:: console
+
+            curl -d '{"selector": "site=ams", "method": "set_power",
+                      "args": [true]}' localhost:8080/commands
+        """
+        if not isinstance(inventory, Inventory):
+            raise TypeError('inventory should be of type Inventory')
+        self.__inventory = inventory
+        self.__fleet = inventory.fleet(**kwargs)
+
+        self.__host = host or '127.0.0.1'
+        self.__port = 8080 if port is None else port
+        if not isinstance(self.__port, int):
+            raise TypeError('port should be of type integer')
+        if self.__port < 0 or self.__port > 65535:
+            raise ValueError('port should be within [0, 65535]')
+
+        self.__chunk = chunk or 64
+        if not isinstance(self.__chunk, int):
+            raise TypeError('chunk should be of type integer')
+        if self.__chunk < 1:
+            raise ValueError('chunk should be positive')
+
+        self.__server = None
+        self.__executor = None
+        self.__clients = {}
+        self.__routes = {
+            '/commands': {'GET': self._commands, 'POST': self._run},
+            '/displays': {'GET': self._displays},
+            '/status': {'GET': self._status},
+        }
+
+    async def __aenter__(self):
+        """Enter a Gateway object.
+        """
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        """Exit the Gateway object.
+        """
+        await self.close()
+
+    def __repr__(self):
+        """String representation of a Gateway object.
+        """
+        return 'Gateway(host={}, port={}, displays={})'.format(
+            self.host, self.port, len(self.__inventory)
+        )
+
+    @property
+    def inventory(self):
+        return self.__inventory
+
+    @property
+    def fleet(self):
+        return self.__fleet
+
+    @property
+    def host(self):
+        return self.__host
+
+    @property
+    def port(self):
+        """Listening port, resolved once started if 0"""
+        return self.__port
+
+    @property
+    def serving(self):
+        return self.__server is not None
+
+    async def start(self):
+        """Open the fleet and start listening.
+        """
+        if self.__server is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self.__executor = ThreadPoolExecutor(
+            max_workers=64, thread_name_prefix='samsung_mdc.gateway',
+        )
+        await loop.run_in_executor(self.__executor, self.__fleet.open)
+        self.__server = await asyncio.start_server(
+            self._handle, self.__host, self.__port,
+        )
+        self.__port = self.__server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Start and serve until cancelled.
+        """
+        await self.start()
+        try:
+            await self.__server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Stop listening and close the fleet.
+        """
+        if self.__server is None:
+            return
+        server, self.__server = self.__server, None
+        server.close()
+        await server.wait_closed()
+        # idle keep-alive connections are not closed by the server
+        for writer in self.__clients.values():
+            writer.close()
+        if self.__clients:
+            done, pending = await asyncio.wait(list(self.__clients),
+                                               timeout=1.)
+            for task in pending:
+                task.cancel()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.__executor, self.__fleet.close)
+        self.__executor.shutdown(wait=False)
+        self.__executor = None
+
+    async def _handle(self, reader, writer):
+        """Private helper to serve the requests of a client connection.
+        """
+        task = asyncio.current_task()
+        self.__clients[task] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {
+                        'error': 'invalid request line'
+                    }, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                connection = headers.get('connection', '').lower()
+                keep_alive = (connection != 'close' if version == 'HTTP/1.1'
+                              else connection == 'keep-alive')
+                try:
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > _max_body:
+                    await self._respond(writer, 413 if length > 0 else 400, {
+                        'error': 'invalid content length'
+                    }, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                await self._dispatch(writer, method, target, headers, body,
+                                     keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # client went away or sent an overlong line
+            pass
+        finally:
+            self.__clients.pop(task, None)
+            writer.close()
+
+    async def _dispatch(self, writer, method: str, target: str,
+                        headers: dict, body: bytes, keep_alive: bool):
+        """Private helper to route a request to its handler.
+        """
+        url = urlsplit(target)
+        route = self.__routes.get(url.path.rstrip('/') or '/')
+        if route is None:
+            await self._respond(writer, 404, {
+                'error': f'{url.path} not found'
+            }, keep_alive)
+            return
+        handler = route.get(method)
+        if handler is None:
+            await self._respond(writer, 405, {
+                'error': f'{method} not allowed on {url.path}'
+            }, keep_alive, {'Allow': ', '.join(route)})
+            return
+        query = {key: values[-1] for key, values in
+                 parse_qs(url.query, keep_blank_values=True).items()}
+        stream = query.pop('stream', '0').lower() in ('1', 'true', 'yes') or \
+            'application/x-ndjson' in headers.get('accept', '')
+        try:
+            data = json.loads(body) if body else {}
+            if not isinstance(data, dict):
+                raise TypeError('request body should be a JSON object')
+            payload = await handler(query, data, stream)
+        except (TypeError, ValueError) as e:
+            await self._respond(writer, 400, {'error': str(e)}, keep_alive)
+            return
+        except Exception as e:
+            await self._respond(writer, 500, {
+                'error': f'{type(e).__name__}: {e}'
+            }, keep_alive)
+            return
+        if stream and hasattr(payload, '__aiter__'):
+            await self._stream(writer, payload, keep_alive)
+        else:
+            await self._respond(writer, 200, payload, keep_alive)
+
+    async def _respond(self, writer, status: int, payload, keep_alive: bool,
+                       headers: dict = None):
+        """Private helper to send a JSON response.
+        """
+        body = _dumps(payload) + b'\n'
+        head = [
+            f'HTTP/1.1 {status} {HTTPStatus(status).phrase}',
+            'Content-Type: application/json',
+            f'Content-Length: {len(body)}',
+            f'Connection: {"keep-alive" if keep_alive else "close"}',
+        ]
+        head += [f'{key}: {value}' for key, value in (headers or {}).items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+        await writer.drain()
+
+    async def _stream(self, writer, lines, keep_alive: bool):
+        """Private helper to send a chunked NDJSON response.
+        """
+        head = [
+            'HTTP/1.1 200 OK',
+            'Content-Type: application/x-ndjson',
+            'Transfer-Encoding: chunked',
+            f'Connection: {"keep-alive" if keep_alive else "close"}',
+        ]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode())
+        try:
+            async for batch in lines:
+                data = b''.join(_dumps(line) + b'\n' for line in batch)
+                if data:
+                    writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+                    await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            # headers are sent, so report the failure in-band
+            data = _dumps({'error': f'{type(e).__name__}: {e}'}) + b'\n'
+            writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    def _indices(self, query: dict, data: dict):
+        """Private helper to resolve the selected display indices.
+        """
+        indices = data.get('indices', query.get('indices'))
+        if indices is None:
+            selector = data.get('selector', query.get('selector'))
+            if selector is not None and not isinstance(selector, str):
+                raise TypeError('selector should be of type string')
+            return self.__inventory.indices(selector)
+        if isinstance(indices, str):
+            indices = [int(index) for index in indices.split(',') if index]
+        if not isinstance(indices, list) or \
+                not all(isinstance(index, int) for index in indices):
+            raise TypeError('indices should be a list of integers')
+        if indices and (min(indices) < 0 or
+                        max(indices) >= len(self.__inventory)):
+            raise ValueError('indices should be within '
+                             f'[0, {len(self.__inventory) - 1}]')
+        return sorted(set(indices))
+
+    def _options(self, query: dict, data: dict):
+        """Private helper to parse the priority, deadline and retries.
+        """
+        priority = data.get('priority', query.get('priority'))
+        if isinstance(priority, str):
+            if priority.isdigit():
+                priority = int(priority)
+            elif priority.lower() in _priorities:
+                priority = _priorities[priority.lower()]
+        # validate once instead of failing on every display
+        if priority is not None and (
+            isinstance(priority, bool) or
+            priority not in _priorities.values()
+        ):
+            raise ValueError('priority should be any of '
+                             f'{tuple(_priorities)} or '
+                             f'{tuple(_priorities.values())}')
+        deadline = data.get('deadline', query.get('deadline'))
+        if deadline is not None:
+            try:
+                if isinstance(deadline, bool):
+                    raise TypeError
+                deadline = float(deadline)
+            except (TypeError, ValueError):
+                raise ValueError('deadline should be a number of seconds') \
+                    from None
+            if not math.isfinite(deadline) or deadline <= 0. or \
+                    deadline > threading.TIMEOUT_MAX:
+                raise ValueError('deadline should be within '
+                                 f'(0, {threading.TIMEOUT_MAX:g}]')
+        retries = data.get('retries', query.get('retries'))
+        if retries is not None:
+            retries = int(retries)
+            if retries < 0:
+                raise ValueError('retries should be non-negative')
+        return {'priority': priority, 'deadline': deadline,
+                'retries': retries}
+
+    async def _results(self, indices: list, method: str, args: tuple,
+                       options: dict, convert, stream: bool):
+        """Private helper to call a method on the selected displays in
+        concurrent chunks.
+        """
+        loop = asyncio.get_running_loop()
+        size = max(self.__chunk, -(-len(indices) // _max_chunks))
+        expires = None if options['deadline'] is None \
+            else time.monotonic() + options['deadline']
+        futures = [
+            loop.run_in_executor(self.__executor, partial(
+                self._chunk, method, args, indices[i:i + size], options,
+                expires,
+            ))
+            for i in range(0, len(indices), size)
+        ]
+        if stream:
+            async def lines():
+                try:
+                    for future in asyncio.as_completed(futures):
+                        yield [convert(result) for result in await future]
+                finally:
+                    for future in futures:
+                        future.cancel()
+            return lines()
+        results = []
+        for batch in await asyncio.gather(*futures):
+            results += [convert(result) for result in batch]
+        return {'results': results}
+
+    def _chunk(self, method: str, args: tuple, indices: list, options: dict,
+               expires: float = None):
+        """Private helper to call a method on a chunk of displays within the
+        time left until the request expires.
+        """
+        if expires is not None:
+            remaining = expires - time.monotonic()
+            if remaining <= 0.:
+                displays = self.__fleet.displays
+                return [FleetResult(index, displays[index], None,
+                                    'TimeoutError: deadline exceeded')
+                        for index in indices]
+            options = dict(options, deadline=remaining)
+        return self.__fleet.run(method, *args, indices=indices, **options)
+
+    async def _commands(self, query: dict, data: dict, stream: bool):
+        """GET /commands: registered commands.
+        """
+        commands = []
+        for command in COMMANDS.values():
+            fields = []
+            for field in command.fields:
+                kind, values = field.describe()
+                fields.append({'name': field.name, 'type': kind.strip('`'),
+                               'values': values})
+            commands.append({'name': command.name, 'code': command.code,
+                             'get': command.get, 'set': command.set,
+                             'fields': fields})
+        return {'commands': commands}
+
+    async def _displays(self, query: dict, data: dict, stream: bool):
+        """GET /displays: display entries of a selector.
+        """
+        return {'displays': [dict(self.__inventory[index], index=index)
+                             for index in self._indices(query, data)]}
+
+    async def _status(self, query: dict, data: dict, stream: bool):
+        """GET /status: status snapshot of the selected displays.
+        """
+        names = data.get('commands', query.get('commands'))
+        if names is None:
+            names = ['power', 'source', 'volume']
+        elif isinstance(names, str):
+            names = [name for name in names.split(',') if name]
+        requests = tuple((f'get_{name}',) for name in names)
+        for request in requests:
+            lookup(request[0])
+        indices = self._indices(query, data)
+        options = self._options(query, data)
+        return await self._results(indices, 'batch', (requests,), options,
+                                   _status(names), stream)
+
+    async def _run(self, query: dict, data: dict, stream: bool):
+        """POST /commands: call one method on the selected displays.
+        """
+        method = data.get('method')
+        if not isinstance(method, str):
+            raise TypeError('method should be of type string')
+        command, action = lookup(method)
+        args = data.get('args', [])
+        if not isinstance(args, list):
+            args = [args]
+        if action == 'set':
+            # validate once instead of failing on every display
+            command.encode(*args)
+        elif args:
+            raise TypeError(f'{method} takes no arguments')
+        indices = self._indices(query, data)
+        options = self._options(query, data)
+        return await self._results(indices, method, tuple(args), options,
+                                   _result, stream)
+
+
+def main():
+    """HTTP/JSON gateway to an inventory of Samsung Multiple Display Control
+    displays
+    """
+
+    parser = argparse.ArgumentParser(
+        prog='samsung_mdc_gateway',
+        description='HTTP/JSON gateway to Samsung displays',
+    )
+    parser.add_argument(
+        'inventory', metavar='inventory', type=str,
+        help='Inventory file (.json or .csv)'
+    )
+    parser.add_argument(
+        '-H', '--host', metavar='..', type=str, default='127.0.0.1',
+        help='Interface to listen on (default: 127.0.0.1)'
+    )
+    parser.add_argument(
+        '-p', '--port', metavar='..', type=int, default=8080,
+        help='Port to listen on (default: 8080)'
+    )
+    parser.add_argument(
+        '-n', '--processes', metavar='..', type=int, default=None,
+        help=('Number of worker processes. If 0, one per cpu core is used '
+              '(default: none)')
+    )
+    parser.add_argument(
+        '-t', '--timeout', metavar='..', type=float, default=5.,
+        help='Socket timeout of each display, in seconds (default: 5.0)'
+    )
+    parser.add_argument(
+        '-c', '--chunk', metavar='..', type=int, default=64,
+        help='Number of displays per concurrent chunk (default: 64)'
+    )
+    args = parser.parse_args()
+
+    gateway = Gateway(Inventory.load(args.inventory), args.host, args.port,
+                      args.chunk, processes=args.processes,
+                      timeout=args.timeout)
+    print(f'Serving {len(gateway.inventory)} displays on '
+          f'http://{args.host}:{args.port}')
+    try:
+        asyncio.run(gateway.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+r"""
+
+:mod:`history` -- History
+=========================
+
+Append-only, memory-mapped history log of polled display state
+
+"""
+
+# mandatory imports
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# relative imports
+from .commands import CODES
+
+
+__all__ = ['History', 'HistoryRecord']
+
+
+# segment header: magic, version, record size, record count
+_header = struct.Struct('<4sHHQ')
+_magic = b'MDCH'
+_version = 1
+
+# record: timestamp (us), display index, command, pad, value
+_record = struct.Struct('<qIBxH')
+
+_suffix = '.mdch'
+
+# last value snapshot: magic, version, segment number, record count in that
+# segment, timestamp (us) of the last record, followed by the entries
+_snapshot = struct.Struct('<4sHxxIQq')
+_snapshot_magic = b'MDCL'
+_snapshot_name = 'last.mdcl'
+
+# snapshot entry: display index, command, pad, value
+_entry = struct.Struct('<IBxH')
+
+_now = time.time
+
+HistoryRecord = namedtuple('HistoryRecord', 'time index command value')
+
+
+def _microseconds(value):
+    """Private helper to convert a timestamp to integer microseconds.
+    """
+    if isinstance(value, datetime):
+        value = value.timestamp()
+    if not isinstance(value, (int, float)):
+        raise TypeError('time should be a datetime or a float in seconds')
+    return int(round(value * 1e6))
+
+
+class _Segment(object):
+    """Private memory-mapped segment file with a fixed number of records.
+    """
+
+    __slots__ = ('path', 'capacity', 'file', 'map', 'count', 'writable')
+
+    def __init__(self, path: str, capacity: int = None,
+                 writable: bool = False):
+        self.path = path
+        self.writable = writable
+        if capacity is not None and not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(_header.pack(_magic, _version, _record.size, 0))
+                f.truncate(_header.size + capacity * _record.size)
+        self.file = open(path, 'r+b' if writable else 'rb')
+        self.map = mmap.mmap(
+            self.file.fileno(), 0,
+            access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ,
+        )
+        magic, version, size, self.count = _header.unpack_from(self.map, 0)
+        if magic != _magic or version != _version or size != _record.size:
+            self.close()
+            raise ValueError(f'{path} is not a valid history segment')
+        self.capacity = (len(self.map) - _header.size) // _record.size
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+    def refresh(self):
+        """Re-read the record count written by another process.
+        """
+        self.count = _header.unpack_from(self.map, 0)[3]
+
+    def time(self, i: int):
+        """Timestamp in microseconds of record ``i``.
+        """
+        return struct.unpack_from(
+            '<q', self.map, _header.size + i * _record.size
+        )[0]
+
+    def bisect(self, us: int):
+        """First record index with a timestamp not before ``us``.
+        """
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.time(mid) < us:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def append(self, us: int, index: int, command: int, value: int):
+        _record.pack_into(self.map, _header.size + self.count * _record.size,
+                          us, index, command, value)
+        self.count += 1
+        # publish the record only after it has been written
+        struct.pack_into('<Q', self.map, 8, self.count)
+
+    def view(self, first: int, last: int):
+        """Zero-copy view of records ``first`` up to ``last``.
+        """
+        return memoryview(self.map)[_header.size + first * _record.size:
+                                    _header.size + last * _record.size]
+
+    def flush(self):
+        if self.writable:
+            self.map.flush()
+
+    def close(self):
+        self.flush()
+        try:
+            self.map.close()
+        except BufferError:
+            # a suspended scan still holds a view, the map is unmapped when
+            # that view is released
+            pass
+        self.file.close()
+
+
+class History(object):
+    """
+    """
+
+    __slots__ = (
+        "__path",
+        "__segment_size",
+        "__writable",
+        "__segments",
+        "__last",
+        "__latest",
+    )
+
+    def __init__(self, path: str, mode: str = None, segment_size: int = None):
+        """Open an append-only history log of display state changes.
+
+        The log is a directory of memory-mapped segment files with fixed-width
+        binary records (timestamp, display index, command, value) of 16 bytes.
+        A new segment is created when the current one is full. Only changes
+        are recorded: a value identical to the last recorded value of the
+        same display and command is dropped. The last values are saved in a
+        snapshot on :meth:`flush` and :meth:`close`, so that reopening the
+        log only replays the records appended after the snapshot.
+
+        Parameters:
+        -----------
+        path : `str`
+            History directory. Created if it does not exist.
+
+        mode : `str`, optional
+            Open mode ``'a'`` to append (default) or ``'r'`` to read only.
+
+        segment_size : `int`, optional
+            Number of records per segment file. Defaults to 1048576 (16 MB).
+
+        Example:
+        --------
+
+        Record state changes and scan the last hour:
+
+        >>> with History('/var/lib/mdc') as history:
+                history.record(0, 0x11, 1)
+                for rec in history.scan(time.time() - 3600):
+                    print(rec)
+        """
+        self.__path = path
+        if not isinstance(self.__path, str):
+            raise TypeError('path should be of type string')
+
+        mode = mode or 'a'
+        if mode not in ('a', 'r'):
+            raise ValueError('mode should be either "a" or "r"')
+        self.__writable = mode == 'a'
+
+        self.__segment_size = segment_size or 1048576
+        if not isinstance(self.__segment_size, int):
+            raise TypeError('segment_size should be of type integer')
+        if self.__segment_size < 1:
+            raise ValueError('segment_size should be positive')
+
+        if self.__writable:
+            os.makedirs(self.__path, exist_ok=True)
+
+        self.__segments = []
+        self.__last = {}
+        self.__latest = 0
+        self._load()
+
+    def __del__(self):
+        """Destruct the History object.
+        """
+        try:
+            # unmap only, the snapshot is saved by flush and close
+            self._unmap()
+        except AttributeError:
+            pass
+
+    def __enter__(self):
+        """Enter a History object.
+        """
+        return self
+
+    def __exit__(self, *args):
+        """Exit the History object.
+        """
+        self.close()
+
+    def __len__(self):
+        """Total number of records.
+        """
+        return sum(seg.count for seg in self.__segments)
+
+    def __repr__(self):
+        """String representation of a History object.
+        """
+        return 'History(path={}, records={}, segments={})'.format(
+            self.path, len(self), len(self.__segments)
+        )
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def segment_size(self):
+        return self.__segment_size
+
+    @property
+    def writable(self):
+        return self.__writable
+
+    def _load(self):
+        """Private helper to map the existing segments.
+        """
+        for seg in self.__segments:
+            seg.close()
+        self.__segments = []
+        if not os.path.isdir(self.__path):
+            return
+        names = sorted(name for name in os.listdir(self.__path)
+                       if name.endswith(_suffix))
+        for i, name in enumerate(names):
+            # only the last segment is appended to
+            writable = self.__writable and i == len(names) - 1
+            self.__segments.append(
+                _Segment(os.path.join(self.__path, name), writable=writable)
+            )
+        if self.__writable:
+            # restore the last value of each display and command
+            first, offset = self._load_snapshot()
+            for seg in self.__segments[first:]:
+                view = seg.view(offset, seg.count)
+                try:
+                    for us, index, command, value in \
+                            _record.iter_unpack(view):
+                        self.__last[(index, command)] = value
+                finally:
+                    view.release()
+                offset = 0
+            if self.__segments and self.__segments[-1].count:
+                seg = self.__segments[-1]
+                self.__latest = seg.time(seg.count - 1)
+
+    @staticmethod
+    def _number(seg):
+        """Private helper to get the sequence number of a segment.
+        """
+        return int(os.path.basename(seg.path)[:-len(_suffix)])
+
+    def _load_snapshot(self):
+        """Private helper to restore the last values from the snapshot.
+
+        Returns the position of the segment and record to replay from, or
+        the start of the log if the snapshot is missing or stale.
+        """
+        self.__last = {}
+        try:
+            with open(os.path.join(self.__path, _snapshot_name), 'rb') as f:
+                data = f.read()
+            magic, version, number, count, latest = \
+                _snapshot.unpack_from(data, 0)
+        except (OSError, struct.error):
+            return 0, 0
+        numbers = [self._number(seg) for seg in self.__segments]
+        if magic != _snapshot_magic or version != _version or \
+                number not in numbers or \
+                (len(data) - _snapshot.size) % _entry.size:
+            return 0, 0
+        first = numbers.index(number)
+        if count > self.__segments[first].count:
+            return 0, 0
+        for index, command, value in _entry.iter_unpack(
+            memoryview(data)[_snapshot.size:]
+        ):
+            self.__last[(index, command)] = value
+        return first, count
+
+    def _save_snapshot(self):
+        """Private helper to save the last values, replaced atomically.
+        """
+        if not self.__writable or not self.__segments:
+            return
+        seg = self.__segments[-1]
+        data = bytearray(_snapshot.pack(
+            _snapshot_magic, _version, self._number(seg), seg.count,
+            self.__latest,
+        ))
+        for (index, command), value in self.__last.items():
+            data += _entry.pack(index, command, value)
+        path = os.path.join(self.__path, _snapshot_name)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+
+    def _rotate(self):
+        """Private helper to start a new segment.
+        """
+        if self.__segments:
+            self.__segments[-1].flush()
+            seq = self._number(self.__segments[-1]) + 1
+        else:
+            seq = 0
+        self.__segments.append(_Segment(
+            os.path.join(self.__path, f'{seq:08d}{_suffix}'),
+            capacity=self.__segment_size, writable=True,
+        ))
+        return self.__segments[-1]
+
+    def record(self, index: int, command: int, value: int, time=None):
+        """Record a display state value if it changed.
+
+        Parameters:
+        -----------
+        index : `int`
+            Display index [0, 4294967295].
+
+        command : `int`
+            Command id [0, 255].
+
+        value : `int` or `bool`
+            State value [0, 65535].
+
+        time : `float` or `datetime`, optional
+            Timestamp in seconds since the epoch. Defaults to now.
+            A timestamp before the last record, e.g. after the system clock
+            was stepped back, is clamped to the last record.
+
+        Returns:
+        --------
+        recorded : `bool`
+            `True` if the value was appended, `False` if unchanged.
+        """
+        if not self.__writable:
+            raise RuntimeError('history is opened read-only')
+        if not all(isinstance(arg, (bool, int))
+                   for arg in (index, command, value)):
+            raise TypeError('index, command and value should be integers')
+        value = int(value)
+        if value < 0 or value > 65535:
+            raise ValueError('value should be within [0, 65535]')
+
+        key = (index, command)
+        if self.__last.get(key) == value:
+            return False
+
+        # records stay ordered in time for bisection
+        us = max(_microseconds(_now() if time is None else time),
+                 self.__latest)
+
+        seg = self.__segments[-1] if self.__segments else None
+        if seg is None or seg.full:
+            seg = self._rotate()
+        seg.append(us, index, command, value)
+        self.__last[key] = value
+        self.__latest = us
+        return True
+
+    def feed(self, event):
+        """Record a :class:`~samsung_mdc.poller.ChangeEvent`.
+
+        Use as subscription callback of a poller, e.g.
+        ``poller.subscribe(history.feed)``. The value is stored as its reply
+        data bytes, packed big-endian into a single integer. Events of text
+        commands, such as the serial number or model name, and events
+        without a value are skipped.
+
+        Returns:
+        --------
+        recorded : `bool`
+            `True` if the value was appended, `False` if unchanged or
+            skipped.
+        """
+        command = CODES.get(event.command)
+        if command is None or command.raw is None or event.new is None:
+            return False
+        value = int.from_bytes(bytes(command.raw(event.new)), 'big')
+        return self.record(event.index, event.command, value, time=event.time)
+
+    def last(self, index: int, command: int):
+        """Get the last recorded value of a display and command, or `None`.
+        """
+        return self.__last.get((index, command))
+
+    def scan(self, start=None, end=None):
+        """Iterate over the records within a time range.
+
+        Segments outside the range are skipped and the first record is
+        located by bisection. Records are unpacked directly from the mapped
+        segments without loading them into memory.
+
+        Parameters:
+        -----------
+        start : `float` or `datetime`, optional
+            Inclusive start time. Defaults to the first record.
+
+        end : `float` or `datetime`, optional
+            Exclusive end time. Defaults to the last record.
+
+        Returns:
+        --------
+        records : iterator of :class:`HistoryRecord`
+
+        The history may be closed while a scan is suspended, the scan then
+        stops at the end of the current segment.
+        """
+        start = None if start is None else _microseconds(start)
+        end = None if end is None else _microseconds(end)
+        if not self.__writable:
+            self.refresh()
+        for seg in self.__segments:
+            if seg.map.closed:
+                return
+            if seg.count == 0:
+                continue
+            if start is not None and seg.time(seg.count - 1) < start:
+                continue
+            if end is not None and seg.time(0) >= end:
+                break
+            first = 0 if start is None else seg.bisect(start)
+            last = seg.count if end is None else seg.bisect(end)
+            view = seg.view(first, last)
+            try:
+                for us, index, command, value in _record.iter_unpack(view):
+                    yield HistoryRecord(us / 1e6, index, command, value)
+            finally:
+                view.release()
+
+    def refresh(self):
+        """Pick up segments and records appended by another process.
+        """
+        if not os.path.isdir(self.__path):
+            return
+        names = sorted(name for name in os.listdir(self.__path)
+                       if name.endswith(_suffix))
+        if len(names) != len(self.__segments):
+            self._load()
+        elif self.__segments:
+            self.__segments[-1].refresh()
+
+    def flush(self):
+        """Flush the current segment and the last value snapshot to disk.
+        """
+        if self.__segments:
+            self.__segments[-1].flush()
+            self._save_snapshot()
+
+    def close(self):
+        """Save the last value snapshot and close all segment files.
+        """
+        if self.__segments:
+            self._save_snapshot()
+        self._unmap()
+
+    def _unmap(self):
+        """Private helper to close the segment files.
+        """
+        for seg in self.__segments:
+            seg.close()
+        self.__segments = []
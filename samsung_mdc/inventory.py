@@ -0,0 +1,291 @@
+r"""
+
+:mod:`inventory` -- Inventory
+=============================
+
+Indexed inventory of displays with tags, attributes and selectors
+
+"""
+
+# mandatory imports
+import csv
+import json
+import os
+import re
+from functools import lru_cache
+
+# relative imports
+from .fleet import Fleet, _display_spec
+
+
+__all__ = ['Inventory']
+
+
+# selector tokens: operators, parentheses and key[=|!=value] atoms
+_token = re.compile(r'\s*(?:(\(|\)|&|\||!(?!=))|([^\s&|()!=]+)'
+                    r'(?:\s*(!?=)\s*([^\s&|()]+))?)')
+
+
+@lru_cache(maxsize=1024)
+def _parse(selector: str):
+    """Private helper to compile a selector into a nested tuple tree.
+
+    Grammar, from low to high precedence::
+
+        expr   := term ('|' term)*
+        term   := factor ('&' factor)*
+        factor := '!' factor | '(' expr ')' | key | key '=' value
+                | key '!=' value
+    """
+    tokens = []
+    pos = 0
+    selector = selector.strip()
+    while pos < len(selector):
+        match = _token.match(selector, pos)
+        if match is None or match.end() == pos:
+            raise ValueError(f'invalid selector "{selector}" at '
+                             f'position {pos}')
+        op, key, cmp, value = match.groups()
+        tokens.append(op if op else (key, cmp, value))
+        pos = match.end()
+        while pos < len(selector) and selector[pos].isspace():
+            pos += 1
+
+    def expr(i):
+        node, i = term(i)
+        while i < len(tokens) and tokens[i] == '|':
+            right, i = term(i + 1)
+            node = ('|', node, right)
+        return node, i
+
+    def term(i):
+        node, i = factor(i)
+        while i < len(tokens) and tokens[i] == '&':
+            right, i = factor(i + 1)
+            node = ('&', node, right)
+        return node, i
+
+    def factor(i):
+        if i >= len(tokens):
+            raise ValueError(f'incomplete selector "{selector}"')
+        token = tokens[i]
+        if token == '!':
+            node, i = factor(i + 1)
+            return ('!', node), i
+        if token == '(':
+            node, i = expr(i + 1)
+            if i >= len(tokens) or tokens[i] != ')':
+                raise ValueError(f'unbalanced parentheses in "{selector}"')
+            return node, i + 1
+        if isinstance(token, tuple):
+            key, cmp, value = token
+            if cmp is None:
+                return ('has', key), i + 1
+            node = ('=', key, value)
+            return (node if cmp == '=' else ('!', node)), i + 1
+        raise ValueError(f'unexpected "{token}" in selector "{selector}"')
+
+    if not tokens:
+        return ('all',)
+    node, i = expr(0)
+    if i != len(tokens):
+        token = tokens[i]
+        if isinstance(token, tuple):
+            token = ''.join(part for part in token if part)
+        raise ValueError(f'unexpected "{token}" in selector "{selector}"')
+    return node
+
+
+class Inventory(object):
+    """
+    """
+
+    __slots__ = (
+        "__displays",
+        "__specs",
+        "__present",
+        "__values",
+        "__all",
+    )
+
+    def __init__(self, displays):
+        """Construct an indexed inventory of displays.
+
+        Each display is a dictionary with a ``host`` and optionally a
+        ``port``, ``id``, a list of ``tags`` and any other attributes, such as
+        ``site``, ``floor``, ``wall`` or ``model``. Inverted indexes of the
+        tags and attribute values map to bitsets of displays, so that
+        selectors resolve with a few integer operations.
+
+        Selectors combine ``key=value``, ``key!=value`` and bare ``key``
+        (tag or attribute present) with ``&``, ``|``, ``!`` and parentheses,
+        from low to high precedence. ``key!=value`` is the negation of
+        ``key=value`` and also selects the displays without ``key``. An
+        empty selector selects all displays.
+
+        Parameters:
+        -----------
+        displays : `list` of `dict`
+            Display entries.
+
+        Example:
+        --------
+
+        >>> inventory = Inventory.load('displays.json')
+        >>> inventory.select('site=ams & floor=3 & !wall')
+        >>> with inventory.fleet('site=ams & model=QM55R') as fleet:
+                fleet.run('set_power', True)
+        """
+        self.__displays = []
+        self.__specs = []
+        self.__present = {}
+        self.__values = {}
+        for display in displays:
+            self.add(display)
+
+    def __len__(self):
+        """Number of displays.
+        """
+        return len(self.__displays)
+
+    def __iter__(self):
+        """Iterate over the display entries.
+        """
+        return iter(self.__displays)
+
+    def __getitem__(self, index: int):
+        """Get a display entry by index.
+        """
+        return self.__displays[index]
+
+    def __repr__(self):
+        """String representation of an Inventory object.
+        """
+        return 'Inventory(displays={}, keys={})'.format(
+            len(self), len(self.__present)
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        """Load an inventory from a JSON or CSV file.
+
+        A JSON file contains a list of display entries. A CSV file has a
+        header row with at least a ``host`` column. Its ``tags`` column
+        holds tags separated by spaces or semicolons and empty cells are
+        ignored.
+
+        Parameters:
+        -----------
+        path : `str`
+            Inventory file path ending on ``.json`` or ``.csv``.
+        """
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in ('.json', '.csv'):
+            raise ValueError('path should end on .json or .csv')
+        with open(path, newline='') as f:
+            if ext == '.json':
+                displays = json.load(f)
+            else:
+                displays = []
+                for row in csv.DictReader(f):
+                    row = {k: v for k, v in row.items() if v not in (None, '')}
+                    row['tags'] = re.split(r'[\s;]+',
+                                           row.get('tags', '').strip())
+                    for key in ('port', 'id'):
+                        if key in row:
+                            row[key] = int(row[key], 0)
+                    displays.append(row)
+        return cls(displays)
+
+    @property
+    def keys(self):
+        """Set of all tags and attribute keys"""
+        return set(self.__present)
+
+    def add(self, display: dict):
+        """Add a display entry and index its tags and attributes.
+
+        Returns:
+        --------
+        index : `int`
+            Index of the added display.
+        """
+        if not isinstance(display, dict):
+            raise TypeError('display should be of type dict')
+        if 'host' not in display:
+            raise ValueError('display should have a host')
+        tags = display.get('tags') or []
+        if isinstance(tags, str):
+            tags = [tags]
+
+        index = len(self.__displays)
+        spec = _display_spec((display['host'], display.get('port'),
+                              display.get('id')))
+        bit = 1 << index
+        for tag in tags:
+            if tag:
+                self.__present[tag] = self.__present.get(tag, 0) | bit
+        for key, value in display.items():
+            if key == 'tags':
+                continue
+            self.__present[key] = self.__present.get(key, 0) | bit
+            key = (key, str(value))
+            self.__values[key] = self.__values.get(key, 0) | bit
+        self.__displays.append(dict(display))
+        self.__specs.append(spec)
+        self.__all = (1 << len(self.__displays)) - 1
+        return index
+
+    def _mask(self, node: tuple):
+        """Private helper to evaluate a selector tree to a bitset.
+        """
+        op = node[0]
+        if op == '&':
+            return self._mask(node[1]) & self._mask(node[2])
+        if op == '|':
+            return self._mask(node[1]) | self._mask(node[2])
+        if op == '!':
+            return self.__all & ~self._mask(node[1])
+        if op == 'has':
+            return self.__present.get(node[1], 0)
+        if op == '=':
+            return self.__values.get((node[1], node[2]), 0)
+        return self.__all
+
+    def mask(self, selector: str = None):
+        """Resolve a selector to a bitset of display indices.
+        """
+        if not self.__displays:
+            return 0
+        return self._mask(_parse(selector or ''))
+
+    def indices(self, selector: str = None):
+        """Resolve a selector to a list of display indices.
+        """
+        # linear in the number of displays, unlike clearing the lowest bit
+        # of a big integer once per selected display
+        bits = bin(self.mask(selector))[:1:-1]
+        return [i for i, bit in enumerate(bits) if bit == '1']
+
+    def select(self, selector: str = None):
+        """Resolve a selector to a list of display entries.
+        """
+        return [self.__displays[i] for i in self.indices(selector)]
+
+    def targets(self, selector: str = None):
+        """Resolve a selector to a list of (host, port, id) tuples.
+        """
+        return [self.__specs[i] for i in self.indices(selector)]
+
+    def fleet(self, selector: str = None, **kwargs):
+        """Create a :class:`Fleet` of the selected displays.
+
+        Parameters:
+        -----------
+        selector : `str`, optional
+            Selector expression. Defaults to all displays.
+
+        **kwargs :
+            Passed to :class:`Fleet`.
+        """
+        return Fleet(self.targets(selector), **kwargs)
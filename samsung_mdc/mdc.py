@@ -9,48 +9,18 @@ Samsung Multiple Display Control object
 
 # mandatory imports
 import socket
+import time
 
 # relative imports
-from .util import is_valid_ipv4_address, verify_key_value
+from .capture import Capture, OUTBOUND, INBOUND
+from .commands import COMMANDS, lookup, _installers
+from .pacing import Pacer
+from .util import is_valid_ipv4_address, parse_reply
 
 
 __all__ = ['MultipleDisplayControl']
 
 
-_commands = {
-    0x11: 'Power',
-    0x12: 'Volume',
-    0x13: 'Mute',
-    0x14: 'Input_source',
-    0x19: 'Screen_size',
-    0x5C: 'Video_wall_mode',
-    0x5D: 'Satefy_Lock',
-    0x84: 'Video_Wall_On',
-    0x89: 'Video_Wall_User',
-}
-
-_input_sources_set = {
-    0x0C: 'Input source',
-    0x18: 'DVI',
-    0x20: 'MagicInfo',
-    0x21: 'HDMI1',
-    0x23: 'HDMI2',
-    0x25: 'DisplayPort'
-}
-
-_input_sources_get = {
-    **_input_sources_set,
-    0x1F: 'DVI_video',
-    0x22: 'HDMI1_PC',
-    0x24: 'HDMI2_PC',
-}
-
-_video_wall_modes = {
-    0x00: 'Natural',
-    0x01: 'Full',
-}
-
-
 class MultipleDisplayControl(object):
     """
     """
@@ -61,11 +31,17 @@ class MultipleDisplayControl(object):
         "__id",
         "__attrs",
         "__socket",
+        "__timeout",
         "__connected",
+        "__pacer",
+        "__sent_at",
+        "__capture",
+        "__buffer",
     )
 
     def __init__(self, host: str, port: int = None, id: int = None,
-                 timeout: float = None, attrs: dict = None, **kwargs):
+                 timeout: float = None, attrs: dict = None,
+                 pacer: Pacer = None, capture: Capture = None, **kwargs):
         """Construct a Samsung Multiple Display Control (MDC) object.
 
         Parameters:
@@ -92,6 +68,14 @@ class MultipleDisplayControl(object):
         attrs : `dict`, optional
             Dictionary of global attributes on this object
 
+        pacer : :class:`Pacer` or `bool`, optional
+            Adaptive pacer of the commands sent. If `True`, a default
+            :class:`Pacer` is created. Defaults to `None` (no pacing).
+
+        capture : :class:`Capture`, optional
+            Wire capture recording every frame sent and received.
+            Defaults to `None` (no capture).
+
         **kwargs :
             Any kwargs are added to the global attributes.
 
@@ -139,9 +123,19 @@ class MultipleDisplayControl(object):
         if kwargs:
             self.attrs = {**self.attrs, **kwargs}
 
-        self.__socket = socket.socket(family=socket.AF_INET,
-                                      type=socket.SOCK_STREAM)
-        self.__socket.settimeout(timeout or 5.)
+        self.__pacer = Pacer() if pacer is True else (pacer or None)
+        if self.__pacer is not None and not isinstance(self.__pacer, Pacer):
+            raise TypeError('pacer should be of type Pacer or bool')
+        self.__sent_at = None
+
+        self.__capture = capture
+        if self.__capture is not None and not isinstance(capture, Capture):
+            raise TypeError('capture should be of type Capture')
+
+        self.__timeout = timeout or 5.
+        self.__buffer = bytearray()
+        self.__socket = None
+        self._new_socket()
 
     def __del__(self):
         """Destruct the MDC object.
@@ -203,7 +197,7 @@ class MultipleDisplayControl(object):
             if name in self.attrs:
                 return self.attrs[name]
             elif name in [slot[2:] for slot in self.__slots__]:
-                return eval(f'self.{name}')
+                return getattr(self, name)
         raise AttributeError(
             "{!r} object has no attribute {!r}".format(
                 type(self).__name__, name
@@ -247,16 +241,50 @@ class MultipleDisplayControl(object):
 
     @property
     def id(self):
+        """Display id addressed by the commands. Daisy-chained displays
+        share a connection and are addressed by changing the id"""
         return self.__id
 
+    @id.setter
+    def id(self, value: int):
+        if not isinstance(value, int):
+            raise TypeError('id should be of type integer')
+        if value < 0 or value > 255:
+            raise ValueError('id should be within [0, 255]')
+        self.__id = value
+
     @property
     def connected(self):
         return self.__connected
 
+    @property
+    def pacer(self):
+        """Adaptive pacer with the learned command rate in its metrics"""
+        return self.__pacer
+
+    @property
+    def capture(self):
+        return self.__capture
+
+    @property
+    def timeout(self):
+        """Timeout of the socket operations, in seconds"""
+        return self.__timeout
+
+    @timeout.setter
+    def timeout(self, value: float):
+        self.__timeout = value
+        if self.__socket.fileno() != -1:
+            self.__socket.settimeout(value)
+
     @property
     def _socket(self):
         return self.__socket
 
+    @property
+    def _display(self):
+        return self.__host, self.__port, self.__id
+
     @property
     def attrs(self):
         """Dictionary of global attributes on this object"""
@@ -278,9 +306,20 @@ class MultipleDisplayControl(object):
         """
         return self.attrs[name]
 
+    def _new_socket(self):
+        """Private helper to create the socket
+        """
+        self.__socket = socket.socket(family=socket.AF_INET,
+                                      type=socket.SOCK_STREAM)
+        self.__socket.settimeout(self.__timeout)
+
     def connect(self):
-        """Connect the socket to the remote TV
+        """Connect the socket to the remote TV. A closed socket is replaced
+        by a new one.
         """
+        if self.__socket.fileno() == -1:
+            self._new_socket()
+        self.__buffer.clear()
         try:
             self.__socket.connect((self.host, self.port))
             self.__connected = True
@@ -299,31 +338,29 @@ class MultipleDisplayControl(object):
         self.__socket.detach()
         self.__connected = False
 
-    def _get(self, command):
-        """Private helper to construct a view control state command
+    def _send(self, command):
+        """Private helper to send a command to the remote TV
         """
-        command_id = verify_key_value(command, _commands, 'command')
-        return [0xAA, command_id, self.id, 0]
+        return self._write(self._frame(command))
 
-    def _set(self, command, *args):
-        """Private helper to construct a controlling command
+    def _frame(self, command):
+        """Private helper to build a command frame with checksum
         """
-        command_id = verify_key_value(command, _commands, 'command')
-
-        if not all(isinstance(arg, (bool, int)) for arg in args):
-            raise TypeError('args should be either a bool or integer')
-
-        args = [abs(int(arg)) % 256 for arg in args]  # limit to uint8
-        return [0xAA, command_id, self.id, len(args)] + list(args)
+        checksum = sum(command[1:]) % 256
+        return bytes(command) + bytes([checksum])
 
-    def _send(self, command):
-        """Private helper to send a command to the remote TV
+    def _write(self, frame: bytes):
+        """Private helper to write a frame to the remote TV
         """
         if not self.connected:
             raise RuntimeError('socket is not connected')
-        checksum = sum(command[1:]) % 256
-        command.append(checksum)
-        return self._socket.send(bytes(command))
+        if self.__pacer is not None:
+            self.__pacer.wait()
+        self.__sent_at = time.monotonic()
+        self._socket.sendall(frame)
+        if self.__capture is not None:
+            self.__capture.write(OUTBOUND, frame, self._display)
+        return len(frame)
 
     def _recv(self):
         """Private helper to receive data from the remote TV
@@ -334,357 +371,146 @@ class MultipleDisplayControl(object):
         try:
             data = self.__socket.recv(4096)
         except socket.timeout:
+            if self.__pacer is not None:
+                self.__pacer.timeout()
             raise socket.timeout("Error! Socket did not get info, "
                                  "when expected")
+        if self.__capture is not None:
+            self.__capture.write(INBOUND, data, self._display)
         return data
 
-    @property
-    def power(self):
-        """View/control the power state (0x11):
-        """
-        return bool(self.get_power())
-
-    @power.setter
-    def power(self, value):
-        self.set_power(value)
-
-    def get_power(self):
-        """View the power state (0x11).
-
-        Returns:
-        --------
-        value: `bool`
-        """
-
-        self._send(self._get(0x11))
-        return self._recv()
-
-    def set_power(self, value):
-        """Control the power state (0x11).
+    def _read_frame(self):
+        """Private helper to read a single reply frame from the remote TV
+        """
+        buffer = self.__buffer
+        while True:
+            start = buffer.find(0xAA)
+            del buffer[:len(buffer) if start < 0 else start]
+            if len(buffer) >= 4 and len(buffer) >= buffer[3] + 5:
+                size = buffer[3] + 5
+                frame = bytes(buffer[:size])
+                del buffer[:size]
+                return frame
+            data = self._recv()
+            if not data:
+                self.close()
+                raise ConnectionError(f'{self} closed the connection')
+            buffer += data
+
+    def _reply(self, command, sent_at: float = None):
+        """Private helper to read and decode the reply to a command sent at
+        ``sent_at`` (default: the last write)
+        """
+        while True:
+            frame = self._read_frame()
+            # skip late replies to earlier commands that timed out
+            if len(frame) > 5 and frame[5] == command.code:
+                if self.__pacer is not None:
+                    self._pace(frame, self.__sent_at if sent_at is None
+                               else sent_at)
+                return command.parse(frame)
+
+    def _request(self, command, frame: bytes):
+        """Private helper to send a command frame and decode its reply
+        """
+        self._write(frame)
+        return self._reply(command)
+
+    def batch(self, requests):
+        """Pipeline several commands over the connection.
+
+        All frames are written before the replies are read, so the round
+        trips overlap.
 
         Parameters:
         -----------
-        state: `bool` or `int`
-        """
-        if not isinstance(value, (bool, int)):
-            raise TypeError('power state should be of type bool or int')
-        self._send(self._set(0x11, bool(value)))
-
-    @property
-    def volume(self):
-        """View/control the volume (0x12).
-        """
-        return self.get_volume()
-
-    @volume.setter
-    def volume(self, value: int):
-        self.set_volume(value)
-
-    def get_volume(self):
-        """View the volume (0x12).
+        requests: `list` of `tuple`
+            Method name and arguments per command, e.g.
+            ``[('get_power',), ('set_volume', 10)]``.
 
         Returns:
         --------
-        value: `int`
-            Get volume [0, 100].
+        results: `list`
+            Decoded reply per command, or the exception when the command was
+            not acknowledged.
+        """
+        commands = []
+        for method, *args in requests:
+            command, action = lookup(method)
+            commands.append((command, command.get_frame(self.id)
+                             if action == 'get'
+                             else command.set_frame(self.id, *args)))
+        sent = []
+        for command, frame in commands:
+            self._write(frame)
+            # the latency of each reply is measured from its own frame
+            sent.append(self.__sent_at)
+        results = []
+        for (command, frame), sent_at in zip(commands, sent):
+            try:
+                results.append(self._reply(command, sent_at))
+            except (RuntimeError, ValueError) as e:
+                results.append(e)
+        return results
+
+    def _pace(self, frame, sent_at: float):
+        """Private helper to feed a reply back to the pacer
         """
-        self._send(self._get(0x12))
-        return self._recv()
-
-    def set_volume(self, value: int):
-        """Control the volume (0x12).
-
-        Parameters:
-        -----------
-        value: `int`
-            Set volume [0, 100].
-        """
-        if not isinstance(value, int):
-            raise TypeError('volume should be of type integer')
-        if value < 0 or value > 100:
-            raise ValueError('volume should be within [0, 100]')
-        self._send(self._set(0x12, value))
-
-    @property
-    def mute(self):
-        """View/control mute state (0x13):
-        """
-        return bool(self.get_mute())
-
-    @mute.setter
-    def mute(self, value: bool):
-        self.set_mute(value)
-
-    def get_mute(self):
-        """View the mute state (0x13).
-
-        Returns:
-        --------
-        value: `bool`
-        """
-        self._send(self._get(0x13))
-        return self._recv()
-
-    def set_mute(self, value):
-        """Control the mute state (0x13).
-
-        Parameters:
-        -----------
-        value: `bool` or `int`
-        """
-        if not isinstance(value, (bool, int)):
-            raise TypeError('mute state should be of type bool or int')
-        self._send(self._set(0x13, bool(value)))
-
-    @property
-    def source(self):
-        """View/control source (0x14).
-        """
-        _input_sources_get(self.get_source())
-
-    @source.setter
-    def source(self, value):
-        self.set_source()
-
-    def get_source(self):
-        """View the source (0x14).
-
-        Returns:
-        --------
-        value: `string`
-            Returns the input source id
-        """
-        self._send(self._get(0x14))
-        return self._recv()
-
-    def set_source(self, value):
-        """Control the source (0x14).
-
-        Parameters:
-        -----------
-        value: `int` or `string`
-            Set the source according to the integer/hexadecimal value or name:
-                - 0x0C: Input source
-                - 0x18: DVI
-                - 0x20: MagicInfo
-                - 0x21: HDMI1
-                - 0x23: HDMI2
-                - 0x25: DisplayPort
-        """
-        value = verify_key_value(value, _input_sources_set, 'source')
-        return self._send(self._set(0x14, value))
-
-    @property
-    def screen_size(self):
-        """View/control screen size (0x19).
-        """
-        return self.get_screen_size()
-
-    @screen_size.setter
-    def screen_size(self, value: int):
-        self.set_screen_size(value)
-
-    def get_screen_size(self):
-        """View the screen size (0x19).
-
-        Returns:
-        --------
-        value: `int`
-            Get volume [0, 100].
-        """
-        self._send(self._get(0x19))
-        return self._recv()
-
-    def set_screen_size(self, value: int):
-        """Control the screen size (0x19).
-
-        Parameters:
-        -----------
-        value: `int`
-            Set screen size [0, 255].
-        """
-        if not isinstance(value, int):
-            raise TypeError('screen size should be of type integer')
-        if value < 0 or value > 255:
-            raise ValueError('screen size should be within [0, 255]')
-        self._send(self._set(0x19, value))
-
-    @property
-    def video_wall_mode(self):
-        """View/toggle video wall mode (0x5C).
-        """
-        return _video_wall_modes[self._recv()]
-
-    @video_wall_mode.setter
-    def video_wall_mode(self, value):
-        """
-        """
-        self.set_video_wall_mode(value)
-
-    def get_video_wall_mode(self):
-        """View the video wall mode (0x5C).
-
-        Returns:
-        --------
-        value: `int`
-        """
-        self._send(self._get(0x5C))
-        return self._recv()
-
-    def set_video_wall_mode(self, value):
-        """Control the video wall mode (0x5C).
-
-        Parameters:
-        -----------
-        value: `int` or `str`
-            Set video wall mode:
-                - 0: Natural
-                - 1: Full
-        """
-        value = verify_key_value(value, _video_wall_modes, 'video_wall_mode')
-        self._send(self._set(0x5C, value))
-
-    @property
-    def safety_lock(self):
-        """View/control safety lock state (0x5D).
-        """
-        return bool(self.get_safety_lock())
-
-    @safety_lock.setter
-    def safety_lock(self, value):
-        """
-        """
-        self.get_safety_lock(value)
-
-    def get_safety_lock(self):
-        """View the safety lock state (0x5D).
-
-        Returns:
-        --------
-        value: `bool`
-        """
-        self._send(self._get(0x5D))
-        return self._recv()
-
-    def set_safety_lock(self, value):
-        """Control the safety lock state (0x5D).
-
-        Parameters:
-        -----------
-        value: `bool` or `int`
-        """
-        if not isinstance(value, (bool, int)):
-            raise TypeError('safety lock state should be of type bool or int')
-        self._send(self._set(0x5D, bool(value)))
-
-    @property
-    def video_wall_on(self):
-        """View/control video wall on state.
-        """
-        return bool(self.get_video_wall_on())
-
-    @video_wall_on.setter
-    def video_wall_on(self, value: bool):
-        self.set_video_wall_on(value)
-
-    def get_video_wall_on(self):
-        """View the video wall on state (0x5D).
-
-        Returns:
-        --------
-        value: `bool`
-        """
-        self._send(self._get(0x84))
-        return self._recv()
-
-    def set_video_wall_on(self, value):
-        """Control the video wall on state (0x84).
-
-        Parameters:
-        -----------
-        value: `bool` or `int`
-        """
-        if not isinstance(value, (bool, int)):
-            raise TypeError('video wall on should be of type bool or int')
-        self._send(self._set(0x84, bool(value)))
-
-    @property
-    def video_wall_user(self):
-        """View/set video wall user control.
-
-        Parameters:
-        -----------
-        values: (col, row, pos)
-            - col: `int`
-                 Video wall columns (horizontal, max 15).
-                 If 0, video wall is disabled.
-            - row: `int`
-                Video wall rows (vertical, max 15).
-                If 0, video wall is disabled.
-            - pos: `int`
-                Video wall position code (starting first row top/left)
-                Maximum number of positions/screens is limited to 100.
-        """
-        return self.get_video_wall_user()
-
-    @video_wall_user.setter
-    def video_wall_user(self, values: tuple):
-        """
-        """
-        col, row, pos = values
-        self.set_video_wall_user(col, row, pos)
-
-    def get_video_wall_user(self):
-        """Set video wall user control.
-
-        Return:
-        -------
-        col: `int`
-            Set video wall columns (horizontal, max 15).
-            If 0, video wall is disabled.
-        row: `int`
-            Set video wall rows (vertical, max 15).
-            If 0, video wall is disabled.
-        pos: `int`
-            Set video wall position code (starting first row top/left)
-            [1, ``col`` * ``row`` <= 100].
-            Maximum number of positions/screens is limited to 100.
-        """
-        self._send(self._get(0x89))
-        return self._recv()
+        try:
+            ack = parse_reply(frame)[0]
+        except ValueError:
+            ack = False
+        if ack and sent_at is not None:
+            self.__pacer.ack(time.monotonic() - sent_at)
+        else:
+            self.__pacer.nak()
 
-    def set_video_wall_user(self, col: int, row: int = None, pos: int = None):
-        """Set video wall user control.
 
-        Parameters:
-        -----------
-        col: `int`
-            Set video wall columns (horizontal, max 15).
-            If 0, video wall is disabled.
-        row: `int`
-            Set video wall rows (vertical, max 15).
-            If 0, video wall is disabled.
-        pos: `int`
-            Set video wall position code (starting first row top/left)
-            [1, ``col`` * ``row`` <= 100].
-            Maximum number of positions/screens is limited to 100.
-        """
-        row = row or col
-        if not isinstance(col, int) or not isinstance(row, int):
-            raise TypeError('col and row should be of type integer')
-        screens = col * row
-        if col < 0 or col > 15 or row < 0 or row > 15 or screens > 100:
-            raise ValueError('col and row should be within [0, 15] '
-                             'with total number of screens <= 100')
-        if screens == 0:
-            wall_div = '0x00'
-            wall_sno = '0x00'
-        else:
-            wall_div = f'0x{hex(row)[-1]}{hex(col)[-1]}'
-            if not isinstance(pos, int):
-                raise TypeError('pos should be of type integer')
-            if pos < 1 or pos > screens:
-                raise ValueError(f'pos should be within [1, {screens}]')
-            wall_sno = int(pos)
-
-        self._send(self._set(0x89, wall_div, wall_sno))
+def _install(command):
+    """Private helper to generate the ``get_<name>`` and ``set_<name>``
+    methods and the ``<name>`` property of a registered command
+    """
+    getter = setter = None
+
+    if command.get:
+        def get(self):
+            return self._request(command, command.get_frame(self.id))
+
+        getter = get
+        getter.__name__ = f'get_{command.name}'
+        getter.__qualname__ = f'MultipleDisplayControl.{getter.__name__}'
+        getter.__doc__ = command.doc('get')
+        setattr(MultipleDisplayControl, getter.__name__, getter)
+
+    if command.set:
+        def set(self, *args):
+            return self._request(command, command.set_frame(self.id, *args))
+
+        setter = set
+        setter.__name__ = f'set_{command.name}'
+        setter.__qualname__ = f'MultipleDisplayControl.{setter.__name__}'
+        setter.__doc__ = command.doc('set')
+        setattr(MultipleDisplayControl, setter.__name__, setter)
+
+    if getter is None:
+        return
+
+    if setter is None:
+        fset = None
+    elif len(command.fields) > 1:
+        def fset(self, values: tuple):
+            setter(self, *values)
+    else:
+        def fset(self, value):
+            setter(self, value)
+
+    setattr(MultipleDisplayControl, command.name, property(
+        getter, fset,
+        doc=f'View{"/control" if fset else ""} the {command.title} '
+            f'(0x{command.code:02X}).'
+    ))
+
+
+for _command in COMMANDS.values():
+    _install(_command)
+_installers.append(_install)
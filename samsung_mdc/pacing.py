@@ -0,0 +1,194 @@
+r"""
+
+:mod:`pacing` -- Pacing
+=======================
+
+Adaptive per-connection command pacing
+
+"""
+
+# mandatory imports
+import threading
+import time
+
+
+__all__ = ['Pacer']
+
+
+# latency jitter in seconds not taken as queueing in the display
+_jitter = .005
+
+
+class Pacer(object):
+    """
+    """
+
+    __slots__ = (
+        "__rate",
+        "__min_rate",
+        "__max_rate",
+        "__increase",
+        "__decrease",
+        "__slow_start",
+        "__next",
+        "__srtt",
+        "__min_rtt",
+        "__sent",
+        "__acks",
+        "__naks",
+        "__timeouts",
+        "__lock",
+    )
+
+    def __init__(self, rate: float = None, min_rate: float = None,
+                 max_rate: float = None, increase: float = None,
+                 decrease: float = None):
+        """Construct an adaptive command pacer (AIMD).
+
+        Commands are spaced by the inverse of the current rate. The rate
+        starts in slow start: each acknowledged reply doubles the rate until
+        the first NAK or timeout. From then on each acknowledged reply
+        increases the rate additively. The rate is held while the reply
+        latency shows that commands are queueing up in the display. A NAK or
+        timeout decreases the rate multiplicatively and postpones the next
+        command. The rate converges to what the display can sustain.
+
+        Parameters:
+        -----------
+        rate : `float`, optional
+            Initial rate in commands per second (default: 10.).
+
+        min_rate : `float`, optional
+            Lower rate bound in commands per second (default: 0.5).
+
+        max_rate : `float`, optional
+            Upper rate bound in commands per second (default: 1000.).
+
+        increase : `float`, optional
+            Additive rate increase per acknowledged reply (default: 0.5).
+
+        decrease : `float`, optional
+            Multiplicative rate decrease factor on a NAK or timeout
+            within (0, 1) (default: 0.5).
+
+        Example:
+        --------
+
+        >>> with MultipleDisplayControl('192.168.1.100', pacer=Pacer()) as mdc:
+                for i in range(100):
+                    mdc.get_volume()
+                print(mdc.pacer.metrics)
+        """
+        self.__rate = float(rate or 10.)
+        self.__min_rate = float(min_rate or .5)
+        self.__max_rate = float(max_rate or 1000.)
+        if self.__min_rate <= 0. or self.__min_rate > self.__max_rate:
+            raise ValueError('min_rate should be within (0, max_rate]')
+        if self.__rate < self.__min_rate or self.__rate > self.__max_rate:
+            raise ValueError('rate should be within [min_rate, max_rate]')
+
+        self.__increase = float(increase or .5)
+        if self.__increase <= 0.:
+            raise ValueError('increase should be positive')
+
+        self.__decrease = float(decrease or .5)
+        if self.__decrease <= 0. or self.__decrease >= 1.:
+            raise ValueError('decrease should be within (0, 1)')
+
+        self.__slow_start = True
+        self.__next = 0.
+        self.__srtt = None
+        self.__min_rtt = None
+        self.__sent = 0
+        self.__acks = 0
+        self.__naks = 0
+        self.__timeouts = 0
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        """String representation of a Pacer object.
+        """
+        return 'Pacer(rate={:.2f}, min_rate={}, max_rate={})'.format(
+            self.rate, self.min_rate, self.max_rate
+        )
+
+    @property
+    def rate(self):
+        """Current sustainable rate in commands per second"""
+        return self.__rate
+
+    @property
+    def min_rate(self):
+        return self.__min_rate
+
+    @property
+    def max_rate(self):
+        return self.__max_rate
+
+    @property
+    def slow_start(self):
+        """`True` until the first NAK or timeout"""
+        return self.__slow_start
+
+    @property
+    def metrics(self):
+        """Dictionary with the learned rate, latency and reply counters"""
+        return {
+            'rate': self.__rate,
+            'slow_start': self.__slow_start,
+            'srtt': self.__srtt,
+            'min_rtt': self.__min_rtt,
+            'sent': self.__sent,
+            'acks': self.__acks,
+            'naks': self.__naks,
+            'timeouts': self.__timeouts,
+        }
+
+    def wait(self):
+        """Block until the next command is allowed to be sent.
+        """
+        with self.__lock:
+            now = time.monotonic()
+            at = max(now, self.__next)
+            self.__next = at + 1. / self.__rate
+            self.__sent += 1
+        if at > now:
+            time.sleep(at - now)
+
+    def ack(self, latency: float):
+        """Feed back an acknowledged reply and its latency, in seconds.
+        """
+        with self.__lock:
+            self.__acks += 1
+            if self.__min_rtt is None or latency < self.__min_rtt:
+                self.__min_rtt = latency
+            if self.__srtt is None:
+                self.__srtt = latency
+            else:
+                self.__srtt += (latency - self.__srtt) / 8.
+            # hold the rate while replies are delayed by queueing
+            if latency <= 2. * self.__min_rtt + _jitter:
+                self.__rate = min(self.__rate * 2. if self.__slow_start
+                                  else self.__rate + self.__increase,
+                                  self.__max_rate)
+
+    def nak(self):
+        """Feed back a negative acknowledgement or malformed reply.
+        """
+        with self.__lock:
+            self.__naks += 1
+            self._backoff()
+
+    def timeout(self):
+        """Feed back a reply timeout.
+        """
+        with self.__lock:
+            self.__timeouts += 1
+            self._backoff()
+
+    def _backoff(self):
+        """Private helper to decrease the rate and postpone the next command.
+        """
+        self.__slow_start = False
+        self.__rate = max(self.__rate * self.__decrease, self.__min_rate)
+        self.__next = max(self.__next, time.monotonic() + 1. / self.__rate)
@@ -0,0 +1,354 @@
+r"""
+
+:mod:`poller` -- Poller
+=======================
+
+Shared poller of display state publishing change events to subscribers
+
+"""
+
+# mandatory imports
+import asyncio
+import queue
+import threading
+import time
+import warnings
+from collections import namedtuple
+
+# relative imports
+from .fleet import Fleet
+from .scheduler import POLL
+from .commands import lookup
+
+
+__all__ = ['Poller', 'Subscription', 'ChangeEvent']
+
+
+ChangeEvent = namedtuple('ChangeEvent', 'index display command old new time')
+
+
+class Subscription(object):
+    """
+    """
+
+    __slots__ = (
+        "__poller",
+        "__callback",
+        "__commands",
+        "__queue",
+    )
+
+    def __init__(self, poller, callback=None, commands=None,
+                 maxsize: int = None):
+        """Subscription to the change events of a :class:`Poller`.
+
+        Events are delivered to ``callback`` if given, otherwise they are
+        queued and can be retrieved with :meth:`get` or by iterating.
+        Use :meth:`Poller.subscribe` to create a subscription.
+
+        Parameters:
+        -----------
+        poller : :class:`Poller`
+            The publishing poller.
+
+        callback : `callable`, optional
+            Called with each :class:`ChangeEvent` from the polling thread.
+
+        commands : `list`, optional
+            Only deliver events of these command ids. Defaults to all.
+
+        maxsize : `int`, optional
+            Maximum queue size. The oldest event is dropped when full.
+            Defaults to 0 (unbounded).
+        """
+        if callback is not None and not callable(callback):
+            raise TypeError('callback should be callable')
+        self.__poller = poller
+        self.__callback = callback
+        self.__commands = None if commands is None else frozenset(commands)
+        self.__queue = (queue.Queue(maxsize or 0)
+                        if callback is None else None)
+
+    def __enter__(self):
+        """Enter a Subscription object.
+        """
+        return self
+
+    def __exit__(self, *args):
+        """Exit the Subscription object.
+        """
+        self.unsubscribe()
+
+    def __iter__(self):
+        """Iterate over the queued events, blocking until one is available.
+        """
+        while True:
+            yield self.get()
+
+    @property
+    def commands(self):
+        return self.__commands
+
+    def _publish(self, event: ChangeEvent):
+        """Private helper to deliver an event.
+        """
+        commands = self.__commands
+        if commands is not None and event.command not in commands:
+            return
+        if self.__callback is not None:
+            self.__callback(event)
+            return
+        while True:
+            try:
+                self.__queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.__queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: float = None):
+        """Get the next queued event.
+
+        Parameters:
+        -----------
+        timeout : `float`, optional
+            Block at most ``timeout`` seconds, then raise :class:`queue.Empty`.
+            Defaults to `None` to block until an event is available.
+        """
+        if self.__queue is None:
+            raise RuntimeError('events are delivered to the callback')
+        return self.__queue.get(timeout=timeout)
+
+    def unsubscribe(self):
+        """Stop receiving events.
+        """
+        self.__poller.unsubscribe(self)
+
+
+class Poller(object):
+    """
+    """
+
+    __slots__ = (
+        "__fleet",
+        "__commands",
+        "__codes",
+        "__interval",
+        "__state",
+        "__subscriptions",
+        "__lock",
+        "__thread",
+        "__stop",
+    )
+
+    def __init__(self, fleet, commands=None, interval: float = None):
+        """Construct a single shared poller of display state.
+
+        The poller polls all displays of a fleet and publishes a
+        :class:`ChangeEvent` (index, display, command, old, new, time) to all
+        subscribers whenever a state value changes. Displays see one poll
+        stream regardless of the number of subscribers.
+
+        Parameters:
+        -----------
+        fleet : :class:`Fleet` or `list`
+            Fleet of displays, or a list of displays to create one.
+
+        commands : `list`, optional
+            Getter names to poll (default: ``['get_power', 'get_source',
+            'get_volume']``).
+
+        interval : `float`, optional
+            Poll interval of the background thread, in seconds (default: 10.).
+
+        Example:
+        --------
+
+        >>> poller = Poller(['192.168.1.100', '192.168.1.101'])
+        >>> poller.subscribe(print)
+        >>> with poller:
+                time.sleep(60)
+
+        Or consume the events from asyncio:
+
+        >>> async for event in poller.events():
+                print(event)
+        """
+        self.__fleet = fleet if isinstance(fleet, Fleet) else Fleet(fleet)
+        self.__commands = list(commands or ['get_power', 'get_source',
+                                            'get_volume'])
+        self.__codes = {}
+        for method in self.__commands:
+            command, action = lookup(method)
+            if action != 'get':
+                raise ValueError('commands should be getter names')
+            self.__codes[method] = command.code
+
+        self.__interval = float(interval or 10.)
+        if self.__interval <= 0.:
+            raise ValueError('interval should be positive')
+
+        self.__state = {}
+        self.__subscriptions = []
+        self.__lock = threading.Lock()
+        self.__thread = None
+        self.__stop = threading.Event()
+
+    def __enter__(self):
+        """Enter a Poller object and start polling.
+        """
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        """Exit the Poller object.
+        """
+        self.stop()
+
+    def __repr__(self):
+        """String representation of a Poller object.
+        """
+        return 'Poller(displays={}, commands={}, interval={})'.format(
+            len(self.fleet), self.commands, self.interval
+        )
+
+    @property
+    def fleet(self):
+        return self.__fleet
+
+    @property
+    def commands(self):
+        return list(self.__commands)
+
+    @property
+    def interval(self):
+        return self.__interval
+
+    @property
+    def running(self):
+        return self.__thread is not None and self.__thread.is_alive()
+
+    @property
+    def state(self):
+        """Dictionary of the last value per (index, command)"""
+        with self.__lock:
+            return dict(self.__state)
+
+    def subscribe(self, callback=None, commands=None, maxsize: int = None):
+        """Subscribe to change events.
+
+        Parameters:
+        -----------
+        callback : `callable`, optional
+            Called with each :class:`ChangeEvent`. If `None`, the events are
+            queued in the returned subscription.
+
+        commands : `list`, optional
+            Only deliver events of these command ids. Defaults to all.
+
+        maxsize : `int`, optional
+            Maximum queue size (default: 0, unbounded).
+
+        Returns:
+        --------
+        subscription : :class:`Subscription`
+        """
+        subscription = Subscription(self, callback, commands, maxsize)
+        with self.__lock:
+            self.__subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscription.
+        """
+        with self.__lock:
+            if subscription in self.__subscriptions:
+                self.__subscriptions.remove(subscription)
+
+    async def events(self, commands=None):
+        """Asynchronously iterate over the change events.
+
+        Parameters:
+        -----------
+        commands : `list`, optional
+            Only deliver events of these command ids. Defaults to all.
+        """
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        subscription = self.subscribe(
+            lambda event: loop.call_soon_threadsafe(events.put_nowait, event),
+            commands,
+        )
+        try:
+            while True:
+                yield await events.get()
+        finally:
+            subscription.unsubscribe()
+
+    def poll(self):
+        """Poll all displays once and publish the changes.
+
+        Returns:
+        --------
+        events : `list` of :class:`ChangeEvent`
+        """
+        events = []
+        for method in self.__commands:
+            command = self.__codes[method]
+            for result in self.__fleet.run(method, priority=POLL):
+                if result.error is not None:
+                    continue
+                new = result.value
+                key = (result.index, command)
+                with self.__lock:
+                    old = self.__state.get(key)
+                    if old == new:
+                        continue
+                    self.__state[key] = new
+                events.append(ChangeEvent(result.index, result.display,
+                                          command, old, new, time.time()))
+        with self.__lock:
+            subscriptions = list(self.__subscriptions)
+        for event in events:
+            for subscription in subscriptions:
+                try:
+                    subscription._publish(event)
+                except Exception as e:
+                    # a failing subscriber should not stop the others
+                    warnings.warn(f'subscriber failed on {event}: {e!r}')
+        return events
+
+    def _run(self):
+        """Private polling thread loop.
+        """
+        while not self.__stop.is_set():
+            start = time.monotonic()
+            try:
+                self.poll()
+            except Exception as e:
+                # keep polling, e.g. after a worker process was killed
+                warnings.warn(f'poll failed: {e!r}')
+            self.__stop.wait(max(0., self.__interval -
+                                 (time.monotonic() - start)))
+
+    def start(self):
+        """Start polling in a background thread.
+        """
+        if self.running:
+            return
+        self.__stop.clear()
+        self.__fleet.open()
+        self.__thread = threading.Thread(target=self._run, daemon=True,
+                                         name='samsung_mdc.poller')
+        self.__thread.start()
+
+    def stop(self):
+        """Stop polling and close the fleet connections.
+        """
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        self.__fleet.close()
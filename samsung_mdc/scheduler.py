@@ -0,0 +1,334 @@
+r"""
+
+:mod:`scheduler` -- Scheduler
+=============================
+
+Per-connection command scheduler with priority lanes
+
+"""
+
+# mandatory imports
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+__all__ = ['Scheduler', 'DeadlineExceeded', 'INTERACTIVE', 'AUTOMATION',
+           'POLL']
+
+
+# priority lanes, lower is served first
+INTERACTIVE = 0
+AUTOMATION = 1
+POLL = 2
+
+_lanes = (INTERACTIVE, AUTOMATION, POLL)
+
+
+class DeadlineExceeded(RuntimeError):
+    """The deadline of a request expired before it completed.
+
+    Not an :class:`OSError`: an expired request says nothing about the
+    health of the connection.
+    """
+
+
+class Scheduler(object):
+    """
+    """
+
+    __slots__ = (
+        "__mdc",
+        "__maxsize",
+        "__max_age",
+        "__idle",
+        "__lanes",
+        "__pending",
+        "__condition",
+        "__thread",
+        "__closed",
+        "__served",
+        "__shed",
+        "__max_wait",
+    )
+
+    def __init__(self, mdc, maxsize: int = None, max_age: float = None,
+                 idle: float = None):
+        """Construct a command scheduler for a single display connection.
+
+        Commands are queued in three priority lanes (interactive, automation
+        and background poll) and executed one at a time on a worker thread,
+        always serving the highest priority lane first. An interactive
+        command therefore waits for at most the single command in flight.
+        Poll requests are coalesced with an identical queued request, shed
+        when the poll lane is full (oldest first) and dropped when stale.
+
+        Parameters:
+        -----------
+        mdc : :class:`MultipleDisplayControl`
+            Display connection. Connected on first use if needed.
+
+        maxsize : `int`, optional
+            Maximum number of queued commands per lane (default: 64).
+
+        max_age : `float`, optional
+            Poll requests queued longer than ``max_age`` seconds are dropped
+            (default: 10.).
+
+        idle : `float`, optional
+            The worker thread exits after ``idle`` seconds without commands
+            and is restarted on the next command (default: 60.).
+
+        Example:
+        --------
+
+        >>> scheduler = Scheduler(MultipleDisplayControl('192.168.1.100'))
+        >>> future = scheduler.submit('get_power', priority=POLL)
+        >>> scheduler.call('set_source', 'hdmi1', priority=INTERACTIVE)
+        >>> future.result()
+        >>> scheduler.close()
+        """
+        self.__mdc = mdc
+
+        self.__maxsize = maxsize or 64
+        if not isinstance(self.__maxsize, int):
+            raise TypeError('maxsize should be of type integer')
+        if self.__maxsize < 1:
+            raise ValueError('maxsize should be positive')
+
+        self.__max_age = float(max_age or 10.)
+        self.__idle = float(idle or 60.)
+
+        self.__lanes = {lane: deque() for lane in _lanes}
+        self.__pending = {}  # coalescing of queued poll requests
+        self.__condition = threading.Condition()
+        self.__thread = None
+        self.__closed = False
+        self.__served = {lane: 0 for lane in _lanes}
+        self.__shed = 0
+        self.__max_wait = {lane: 0. for lane in _lanes}
+
+    def __enter__(self):
+        """Enter a Scheduler object.
+        """
+        return self
+
+    def __exit__(self, *args):
+        """Exit the Scheduler object.
+        """
+        self.close()
+
+    def __repr__(self):
+        """String representation of a Scheduler object.
+        """
+        return 'Scheduler(mdc={}, queued={})'.format(self.mdc, self.queued)
+
+    @property
+    def mdc(self):
+        return self.__mdc
+
+    @property
+    def queued(self):
+        """Number of queued commands"""
+        with self.__condition:
+            return sum(len(lane) for lane in self.__lanes.values())
+
+    @property
+    def closed(self):
+        return self.__closed
+
+    @property
+    def metrics(self):
+        """Dictionary with the served and shed commands and the maximum
+        queueing delay per lane"""
+        with self.__condition:
+            return {
+                'served': dict(self.__served),
+                'shed': self.__shed,
+                'max_wait': dict(self.__max_wait),
+            }
+
+    def submit(self, method: str, *args, priority: int = None,
+               deadline: float = None, id: int = None):
+        """Queue a :class:`MultipleDisplayControl` method call.
+
+        Parameters:
+        -----------
+        method : `str`
+            Method name, e.g. ``'get_power'`` or ``'set_source'``.
+
+        *args :
+            Arguments passed to the method.
+
+        priority : `int`, optional
+            Priority lane :data:`INTERACTIVE`, :data:`AUTOMATION` (default)
+            or :data:`POLL`.
+
+        deadline : `float`, optional
+            Expiry time of :func:`time.monotonic`. The socket timeout is
+            bounded by the remaining time and the request fails with
+            :class:`DeadlineExceeded` if it expires while queued, or if the
+            reply does not arrive within the bounded timeout. A failed or
+            timed out connect raises the :class:`OSError`.
+
+        id : `int`, optional
+            Display id to address, for daisy-chained displays sharing the
+            connection. Defaults to the id of the connection.
+
+        Returns:
+        --------
+        future : :class:`concurrent.futures.Future`
+            Future of the method result. Cancelled if the request is shed.
+
+        Raises:
+        ------
+        OverflowError
+            When the interactive or automation lane is full.
+        """
+        priority = AUTOMATION if priority is None else priority
+        if priority not in _lanes:
+            raise ValueError(f'priority should be any of {_lanes}')
+        key = (method, args, id)
+        with self.__condition:
+            if self.__closed:
+                raise RuntimeError('scheduler is closed')
+            lane = self.__lanes[priority]
+            if priority == POLL:
+                if key in self.__pending:
+                    return self.__pending[key]
+                if len(lane) >= self.__maxsize:
+                    self._shed(lane.popleft())
+            elif len(lane) >= self.__maxsize:
+                raise OverflowError(f'{self.mdc} priority {priority} lane '
+                                    'is full')
+            future = Future()
+            lane.append((time.monotonic(), key, future, deadline))
+            if priority == POLL:
+                self.__pending[key] = future
+            if self.__thread is None:
+                self.__thread = threading.Thread(
+                    target=self._run, daemon=True,
+                    name=f'samsung_mdc.scheduler.{self.mdc.host}',
+                )
+                self.__thread.start()
+            self.__condition.notify()
+        return future
+
+    def call(self, method: str, *args, priority: int = None,
+             timeout: float = None):
+        """Queue a method call and wait for its result.
+
+        Parameters are as for :meth:`submit`, with ``priority`` defaulting to
+        :data:`INTERACTIVE`, and ``timeout`` the maximum time in seconds to
+        wait for the result.
+        """
+        priority = INTERACTIVE if priority is None else priority
+        return self.submit(method, *args, priority=priority).result(timeout)
+
+    def _shed(self, request):
+        """Private helper to drop a queued poll request.
+        """
+        queued, key, future, deadline = request
+        self.__pending.pop(key, None)
+        self.__shed += 1
+        future.cancel()
+
+    def _next(self):
+        """Private helper to pop the next request, or `None` when idle.
+        """
+        with self.__condition:
+            while True:
+                now = time.monotonic()
+                poll = self.__lanes[POLL]
+                while poll and now - poll[0][0] > self.__max_age:
+                    self._shed(poll.popleft())
+                for priority in _lanes:
+                    lane = self.__lanes[priority]
+                    if lane:
+                        queued, key, future, deadline = lane.popleft()
+                        if priority == POLL:
+                            self.__pending.pop(key, None)
+                        self.__served[priority] += 1
+                        self.__max_wait[priority] = max(
+                            self.__max_wait[priority], now - queued
+                        )
+                        return key, future, deadline
+                if self.__closed or not self.__condition.wait(self.__idle):
+                    self.__thread = None
+                    return None
+
+    def _run(self):
+        """Private worker thread loop.
+        """
+        while True:
+            request = self._next()
+            if request is None:
+                return
+            (method, args, id), future, deadline = request
+            if not future.set_running_or_notify_cancel():
+                continue
+            timeout = self.__mdc.timeout
+            capped = False
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0.:
+                    # expired while queued, the connection is untouched
+                    future.set_exception(DeadlineExceeded('deadline exceeded'))
+                    continue
+                capped = timeout is None or remaining < timeout
+                if capped:
+                    self.__mdc.timeout = remaining
+            connecting = not self.__mdc.connected
+            try:
+                if connecting:
+                    self.__mdc.connect()
+                    if not self.__mdc.connected:
+                        raise ConnectionError(
+                            f'could not connect to {self.__mdc}'
+                        )
+                    connecting = False
+                if id is not None:
+                    self.__mdc.id = id
+                future.set_result(getattr(self.__mdc, method)(*args))
+            except OSError as e:
+                # reconnect on the next command
+                self.__mdc.close()
+                if capped and not connecting and \
+                        isinstance(e, socket.timeout):
+                    # the display is reachable, only its reply did not
+                    # arrive within the budget
+                    error = DeadlineExceeded('deadline exceeded')
+                    error.__cause__ = e
+                    future.set_exception(error)
+                else:
+                    # including connects timed out on the budget, which
+                    # count as connection failures
+                    future.set_exception(e)
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                if self.__mdc.timeout != timeout:
+                    self.__mdc.timeout = timeout
+
+    def close(self, wait: bool = True):
+        """Cancel the queued commands and close the connection.
+
+        Parameters:
+        -----------
+        wait : `bool`, optional
+            Wait for the command in flight to finish (default: `True`).
+        """
+        with self.__condition:
+            self.__closed = True
+            for lane in self.__lanes.values():
+                while lane:
+                    lane.popleft()[2].cancel()
+            self.__pending.clear()
+            thread = self.__thread
+            self.__condition.notify_all()
+        if wait and thread is not None and thread is not \
+                threading.current_thread():
+            thread.join()
+        self.__mdc.close()
@@ -11,7 +11,7 @@ Samsung Multiple Display Control utilities
 import socket
 
 
-__all__ = ['is_valid_ipv4_address', 'verify_key_value']
+__all__ = ['is_valid_ipv4_address', 'verify_key_value', 'parse_reply']
 
 
 def is_valid_ipv4_address(address):
@@ -86,3 +86,46 @@ def verify_key_value(key_value, keys_values: dict, name: str = None):
         raise TypeError(f'{name} should be a either a string or integer')
 
     return key_value
+
+
+def parse_reply(data: bytes):
+    """Parse a reply frame of the remote TV.
+
+    A reply frame consists of the header (0xAA), the reply command (0xFF),
+    the display id, the data length, the ack (``'A'``) or nak (``'N'``), the
+    reply command, the values and the checksum.
+
+    Parameters:
+    -----------
+    data: `bytes`
+        Reply frame received from the remote TV.
+
+    Returns:
+    --------
+    ack: `bool`
+        `True` if acknowledged, `False` if not.
+
+    command: `int`
+        Reply command id.
+
+    values: `tuple`
+        Reply values as integers.
+
+    Raises:
+    ------
+    ValueError:
+        When ``data`` is not a valid reply frame.
+    """
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        raise TypeError('data should be of type bytes')
+    data = bytes(data)
+    if len(data) < 7 or data[0] != 0xAA or data[1] != 0xFF:
+        raise ValueError('data is not a valid reply frame')
+    length = data[3]
+    if length < 2 or len(data) < length + 5:
+        raise ValueError('reply frame is incomplete')
+    if sum(data[1:length + 4]) % 256 != data[length + 4]:
+        raise ValueError('reply frame checksum mismatch')
+    if data[4] not in (0x41, 0x4E):
+        raise ValueError('reply frame has no ack or nak')
+    return data[4] == 0x41, data[5], tuple(data[6:length + 4])
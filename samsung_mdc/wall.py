@@ -0,0 +1,193 @@
+r"""
+
+:mod:`wall` -- Video wall
+=========================
+
+Synchronized timed execution of commands across a video wall
+
+"""
+
+# mandatory imports
+import socket
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# relative imports
+from .commands import CODES, lookup
+from .fleet import _display_spec
+from .mdc import MultipleDisplayControl
+
+
+__all__ = ['VideoWall', 'WallResult']
+
+
+WallResult = namedtuple('WallResult', 'index display skew reply error')
+
+
+class VideoWall(object):
+    """
+    """
+
+    __slots__ = (
+        "__displays",
+        "__timeout",
+        "__connections",
+    )
+
+    def __init__(self, displays, timeout: float = None):
+        """Construct a video wall for synchronized commands.
+
+        All displays are connected upfront. A command is committed at a
+        target monotonic time: the frames of all displays are built in
+        advance and released back-to-back from a single thread at the
+        target time, so the spread is set by the socket writes and not by
+        the round-trip times. The achieved skew is reported per display.
+
+        Parameters:
+        -----------
+        displays : `list`
+            Displays as :class:`MultipleDisplayControl` objects, host strings
+            or (host, port, id) tuples.
+
+        timeout : `float`, optional
+            Socket timeout of each connection, in seconds (default: 5.).
+
+        Example:
+        --------
+
+        >>> with VideoWall(hosts) as wall:
+                results = wall.commit('source', 'hdmi1')
+                print(max(r.skew for r in results))
+        """
+        self.__displays = [_display_spec(display) for display in displays]
+        self.__timeout = timeout
+        self.__connections = None
+
+    def __enter__(self):
+        """Enter a VideoWall object.
+        """
+        self.connect()
+        return self
+
+    def __exit__(self, *args):
+        """Exit the VideoWall object.
+        """
+        self.close()
+
+    def __len__(self):
+        """Number of displays.
+        """
+        return len(self.__displays)
+
+    def __repr__(self):
+        """String representation of a VideoWall object.
+        """
+        return 'VideoWall(displays={})'.format(len(self))
+
+    @property
+    def displays(self):
+        """List of (host, port, id) of each display"""
+        return list(self.__displays)
+
+    @property
+    def connected(self):
+        return self.__connections is not None and all(
+            mdc.connected for mdc in self.__connections
+        )
+
+    def _connect(self, spec: tuple):
+        """Private helper to connect a display with Nagle disabled.
+        """
+        host, port, id = spec
+        mdc = MultipleDisplayControl(host, port, id, timeout=self.__timeout)
+        try:
+            mdc.connect()
+        except OSError:
+            mdc.close()
+        if mdc.connected:
+            # frames must leave immediately at the target time
+            mdc._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return mdc
+
+    def connect(self):
+        """Connect all displays concurrently.
+        """
+        self.close()
+        with ThreadPoolExecutor(max_workers=min(64, len(self) or 1)) as pool:
+            self.__connections = list(pool.map(self._connect,
+                                               self.__displays))
+
+    def close(self):
+        """Close all connections.
+        """
+        for mdc in self.__connections or []:
+            mdc.close()
+        self.__connections = None
+
+    def commit(self, command, *args, at: float = None, lead: float = None):
+        """Execute a controlling command on all displays at a target time.
+
+        Parameters:
+        -----------
+        command : `str` or `int`
+            Command name or code, e.g. ``'source'`` or ``0x14``.
+
+        *args :
+            Arguments as for the ``set_<command>`` method, e.g. ``'hdmi1'``.
+
+        at : `float`, optional
+            Target time of :func:`time.monotonic`. Defaults to now plus
+            ``lead``.
+
+        lead : `float`, optional
+            Time in seconds to prepare before the target time if ``at`` is
+            not given (default: 0.05).
+
+        Returns:
+        --------
+        results : `list` of :class:`WallResult`
+            Per display the skew in seconds of the write after the target
+            time, the decoded reply, or the error message.
+        """
+        if self.__connections is None:
+            self.connect()
+        connections = self.__connections
+        if isinstance(command, int):
+            command = CODES[command].name if command in CODES else ''
+        command, action = lookup(f'set_{command}')
+        frames = [command.set_frame(mdc.id, *args) if mdc.connected
+                  else None for mdc in connections]
+        at = time.monotonic() + (lead or .05) if at is None else at
+
+        # sleep coarsely, then spin for the last millisecond
+        delay = at - time.monotonic() - 1e-3
+        if delay > 0.:
+            time.sleep(delay)
+        while time.monotonic() < at:
+            pass
+
+        sent = [None] * len(connections)
+        errors = [None] * len(connections)
+        for i, (mdc, frame) in enumerate(zip(connections, frames)):
+            if frame is None:
+                errors[i] = f'ConnectionError: could not connect to {mdc}'
+                continue
+            try:
+                mdc._socket.sendall(frame)
+                sent[i] = time.monotonic()
+            except OSError as e:
+                errors[i] = f'{type(e).__name__}: {e}'
+
+        results = []
+        for i, mdc in enumerate(connections):
+            reply = None
+            if errors[i] is None:
+                try:
+                    reply = mdc._reply(command)
+                except (OSError, RuntimeError, ValueError) as e:
+                    errors[i] = f'{type(e).__name__}: {e}'
+            skew = None if sent[i] is None else sent[i] - at
+            results.append(WallResult(i, self.__displays[i], skew, reply,
+                                      errors[i]))
+        return results
@@ -0,0 +1,116 @@
+"""Shared fixtures: a local fake display speaking the MDC protocol."""
+
+import socket
+import threading
+import time
+
+import pytest
+
+
+class FakePanel(object):
+    """TCP server replying to each MDC command with an ACK frame.
+
+    Set values are stored per command code and returned by later gets.
+    ``delay`` postpones every reply by that many seconds.
+    """
+
+    def __init__(self, delay: float = 0.):
+        self.delay = delay
+        self.state = {0x11: (1,), 0x12: (20,), 0x13: (0,), 0x14: (0x21,)}
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.server = socket.socket()
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen()
+        self.port = self.server.getsockname()[1]
+        self.closing = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while not self.closing:
+            try:
+                conn, address = self.server.accept()
+            except OSError:
+                return
+            with self.lock:
+                self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,),
+                             daemon=True).start()
+
+    def _serve(self, conn):
+        buffer = b''
+        with conn:
+            while True:
+                try:
+                    data = conn.recv(4096)
+                except OSError:
+                    return
+                if not data:
+                    return
+                buffer += data
+                while len(buffer) >= 5 and len(buffer) >= 5 + buffer[3]:
+                    size = 5 + buffer[3]
+                    frame, buffer = buffer[:size], buffer[size:]
+                    code, id, values = frame[1], frame[2], frame[4:-1]
+                    with self.lock:
+                        self.requests += 1
+                        if values:
+                            self.state[code] = tuple(values)
+                        values = self.state.get(code, (0,))
+                    if self.delay:
+                        time.sleep(self.delay)
+                    body = [0xFF, id, 2 + len(values), 0x41, code, *values]
+                    try:
+                        conn.sendall(bytes([0xAA, *body, sum(body) % 256]))
+                    except OSError:
+                        return
+
+    def close(self):
+        self.closing = True
+        try:
+            self.server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.server.close()
+
+
+@pytest.fixture
+def panel():
+    panel = FakePanel()
+    yield panel
+    panel.close()
+
+
+@pytest.fixture
+def slow_panel():
+    panel = FakePanel(delay=.3)
+    yield panel
+    panel.close()
+
+
+@pytest.fixture
+def closed_port():
+    """A local port without a listener, refusing connections."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def blackhole_port():
+    """A local port whose accept backlog is full, so that connects hang."""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(0)
+    port = server.getsockname()[1]
+    clients = []
+    for i in range(3):
+        client = socket.socket()
+        client.setblocking(False)
+        client.connect_ex(('127.0.0.1', port))
+        clients.append(client)
+    yield port
+    for client in clients:
+        client.close()
+    server.close()
@@ -0,0 +1,39 @@
+import time
+
+from samsung_mdc import Capture, MultipleDisplayControl, ReplayPanel
+from samsung_mdc.capture import (INBOUND, OUTBOUND, capture_streams,
+                                 replay_client)
+
+
+def test_record_and_replay(panel, tmp_path):
+    path = str(tmp_path / 'session.mdcc')
+    with Capture(path) as capture:
+        with MultipleDisplayControl('127.0.0.1', panel.port, 1,
+                                    capture=capture) as mdc:
+            assert mdc.set_volume(30) == 30
+            assert mdc.get_volume() == 30
+    assert capture_streams(path) == [('127.0.0.1', panel.port, 1)]
+    with ReplayPanel(path, speed=0.) as replay:
+        with MultipleDisplayControl('127.0.0.1', replay.port, 1) as mdc:
+            assert mdc.set_volume(30) == 30
+            assert mdc.get_volume() == 30
+        assert replay.mismatches == 0
+        start = time.monotonic()
+    assert time.monotonic() - start < .5
+
+
+def test_replay_client_reads_split_reply(tmp_path):
+    path = str(tmp_path / 'split.mdcc')
+    display = ('127.0.0.1', 1515, 1)
+    request = bytes([0xAA, 0x12, 0x01, 0x00, 0x13])
+    reply = bytes([0xAA, 0xFF, 0x01, 0x03, 0x41, 0x12, 0x14, 0x6C])
+    with Capture(path) as capture:
+        capture.write(OUTBOUND, request, display)
+        capture.write(INBOUND, reply[:3], display)
+        time.sleep(.05)
+        capture.write(INBOUND, reply[3:], display)
+    with ReplayPanel(path) as replay:
+        with MultipleDisplayControl('127.0.0.1', replay.port, 1,
+                                    timeout=1.) as mdc:
+            results = replay_client(path, mdc)
+    assert results == [(request, reply, reply)]
@@ -0,0 +1,100 @@
+import time
+
+from samsung_mdc import CircuitBreaker, Fleet
+
+
+def test_run(panel):
+    displays = [('127.0.0.1', panel.port, 1), ('127.0.0.1', panel.port, 2)]
+    with Fleet(displays) as fleet:
+        results = fleet.run('set_volume', 40)
+        assert [result.value for result in results] == [40, 40]
+        assert [result.error for result in results] == [None, None]
+        results = fleet.run('get_volume', indices=[1])
+        assert [result.index for result in results] == [1]
+    # daisy-chained displays share the connection
+    assert panel.connections == 1
+
+
+def test_deadline(slow_panel):
+    with Fleet([('127.0.0.1', slow_panel.port, 1)]) as fleet:
+        start = time.monotonic()
+        result, = fleet.run('get_volume', deadline=.1, retries=0)
+        assert time.monotonic() - start < .25
+        assert result.error == 'TimeoutError: deadline exceeded'
+
+
+def test_deadline_does_not_open_breaker(slow_panel):
+    with Fleet([('127.0.0.1', slow_panel.port, 1)]) as fleet:
+        for i in range(4):
+            fleet.run('get_volume', deadline=.2, retries=0)
+        result, = fleet.run('get_volume')
+        assert result.error is None
+        assert result.value == 20
+
+
+def test_unreachable_host_opens_breaker_under_deadline(blackhole_port):
+    with Fleet([('127.0.0.1', blackhole_port, 1)], timeout=1.) as fleet:
+        errors = [fleet.run('get_power', deadline=.1, retries=0)[0].error
+                  for i in range(6)]
+    assert errors[-1] == 'CircuitOpen: display is unreachable'
+
+
+def test_breaker_opens_on_refused_connections(closed_port):
+    with Fleet([('127.0.0.1', closed_port, 1)], timeout=1.) as fleet:
+        errors = [fleet.run('get_power')[0].error for i in range(4)]
+    assert errors[0].startswith('ConnectionRefusedError')
+    assert errors[-1] == 'CircuitOpen: display is unreachable'
+
+
+def test_breaker_probe_closes_circuit(panel):
+    address = ('127.0.0.1', panel.port)
+    breaker = CircuitBreaker(threshold=1, probe_interval=.05)
+    try:
+        breaker.failure(address)
+        assert not breaker.allow(address)
+        for i in range(40):
+            if breaker.allow(address):
+                break
+            time.sleep(.05)
+        assert breaker.allow(address)
+    finally:
+        breaker.close()
+
+
+def test_breaker_probes_concurrently(panel, blackhole_port):
+    alive = ('127.0.0.1', panel.port)
+    dead = ('127.0.0.1', blackhole_port)
+    breaker = CircuitBreaker(threshold=1, probe_interval=.05,
+                             probe_timeout=2.)
+    try:
+        breaker.failure(dead)
+        breaker.failure(alive)
+        start = time.monotonic()
+        while not breaker.allow(alive) and time.monotonic() - start < 5.:
+            time.sleep(.02)
+        # not held up by the connect timeout of the dead display
+        assert time.monotonic() - start < 1.
+        assert not breaker.allow(dead)
+    finally:
+        breaker.close()
+
+
+def test_breaker_is_per_host(panel, closed_port):
+    displays = [('127.0.0.1', closed_port, 1), ('127.0.0.1', panel.port, 1)]
+    with Fleet(displays, timeout=1.) as fleet:
+        for i in range(4):
+            dead, alive = fleet.run('get_power')
+    assert dead.error == 'CircuitOpen: display is unreachable'
+    assert alive.error is None
+
+
+def test_dead_worker_is_restarted(panel):
+    with Fleet([('127.0.0.1', panel.port, 1)], processes=1) as fleet:
+        assert fleet.run('get_volume')[0].value == 20
+        worker, = fleet._Fleet__shards
+        worker.process.kill()
+        worker.process.join()
+        result, = fleet.run('get_volume')
+        assert result.error is None
+        assert result.value == 20
+        assert fleet._Fleet__shards[0] is not worker
@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+
+from samsung_mdc import Gateway, Inventory
+
+
+async def _request(gateway, method, target, body=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', gateway.port)
+    data = b'' if body is None else json.dumps(body).encode()
+    writer.write(f'{method} {target} HTTP/1.1\r\nConnection: close\r\n'
+                 f'Content-Length: {len(data)}\r\n\r\n'.encode() + data)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), body
+
+
+def _serve(inventory, *requests, **kwargs):
+    async def main():
+        async with Gateway(inventory, port=0, **kwargs) as gateway:
+            return [await _request(gateway, *request) for request in requests]
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def inventory(panel):
+    return Inventory([{'host': '127.0.0.1', 'port': panel.port, 'id': i,
+                       'site': 'ams' if i % 2 else 'ber'}
+                      for i in range(1, 21)])
+
+
+def test_run(inventory):
+    (status, body), = _serve(inventory, ('POST', '/commands', {
+        'selector': 'site=ams', 'method': 'set_volume', 'args': [30],
+    }))
+    assert status == 200
+    results = json.loads(body)['results']
+    assert [result['index'] for result in results] == list(range(0, 20, 2))
+    assert all(result['value'] == 30 for result in results)
+
+
+def test_stream_in_chunks(inventory):
+    (status, body), = _serve(inventory, ('GET', '/status?stream=1'),
+                             chunk=1)
+    assert status == 200
+    lines = [line for line in body.split(b'\r\n')
+             if line.startswith(b'{')]
+    results = [json.loads(item) for line in lines
+               for item in line.split(b'\n') if item]
+    assert sorted(result['index'] for result in results) == list(range(20))
+    # at most 8 chunks per request, whatever the chunk size
+    assert len(lines) <= 8
+
+
+@pytest.mark.parametrize('deadline', ['Infinity', 'NaN', '1e400', '-1',
+                                      'soon'])
+def test_invalid_deadline(inventory, deadline):
+    (status, body), = _serve(inventory, (
+        'GET', f'/status?deadline={deadline}'
+    ))
+    assert status == 400
+    assert 'deadline' in json.loads(body)['error']
+
+
+def test_boolean_deadline(inventory):
+    (status, body), = _serve(inventory, ('POST', '/commands', {
+        'method': 'get_power', 'deadline': True,
+    }))
+    assert status == 400
+    assert 'deadline' in json.loads(body)['error']
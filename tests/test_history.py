@@ -0,0 +1,67 @@
+import os
+
+from samsung_mdc import History
+
+
+def test_rotation(tmp_path):
+    with History(str(tmp_path), segment_size=4) as history:
+        for i in range(10):
+            assert history.record(0, 0x12, i, time=1000. + i)
+        assert len(history) == 10
+    names = sorted(name for name in os.listdir(str(tmp_path))
+                   if name.endswith('.mdch'))
+    assert names == ['00000000.mdch', '00000001.mdch', '00000002.mdch']
+    with History(str(tmp_path), 'r') as history:
+        values = [rec.value for rec in history.scan(1003., 1007.)]
+        assert values == [3, 4, 5, 6]
+
+
+def test_unchanged_value_is_dropped(tmp_path):
+    with History(str(tmp_path)) as history:
+        assert history.record(0, 0x11, 1, time=1000.)
+        assert not history.record(0, 0x11, 1, time=1001.)
+        assert history.record(1, 0x11, 1, time=1001.)
+        assert len(history) == 2
+
+
+def test_snapshot_replay_after_reopen(tmp_path):
+    with History(str(tmp_path), segment_size=4) as history:
+        history.record(0, 0x12, 10, time=1000.)
+        history.record(1, 0x12, 20, time=1001.)
+    history = History(str(tmp_path), segment_size=4)
+    # appended after the snapshot, and not saved by another snapshot
+    for i in range(6):
+        history.record(0, 0x13, i % 2, time=1002. + i)
+    history._unmap()
+    with History(str(tmp_path), segment_size=4) as history:
+        assert history.last(0, 0x12) == 10
+        assert history.last(1, 0x12) == 20
+        assert history.last(0, 0x13) == 1
+        assert not history.record(0, 0x13, 1)
+
+
+def test_stale_snapshot_is_ignored(tmp_path):
+    with History(str(tmp_path)) as history:
+        history.record(0, 0x12, 10, time=1000.)
+    with open(str(tmp_path / 'last.mdcl'), 'wb') as f:
+        f.write(b'garbage')
+    with History(str(tmp_path)) as history:
+        assert history.last(0, 0x12) == 10
+
+
+def test_clock_step_back_is_clamped(tmp_path):
+    with History(str(tmp_path)) as history:
+        history.record(0, 0x12, 10, time=2000.)
+        history.record(0, 0x12, 11, time=1000.)
+        assert [rec.time for rec in history.scan()] == [2000., 2000.]
+        assert [rec.value for rec in history.scan(2000.)] == [10, 11]
+
+
+def test_close_during_scan(tmp_path):
+    history = History(str(tmp_path), segment_size=2)
+    for i in range(4):
+        history.record(0, 0x12, i, time=1000. + i)
+    records = history.scan()
+    assert next(records).value == 0
+    history.close()
+    assert [rec.value for rec in records] == [1]
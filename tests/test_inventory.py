@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from samsung_mdc import Inventory
+
+
+@pytest.fixture
+def inventory():
+    return Inventory([
+        {'host': '10.0.0.1', 'site': 'ams', 'floor': 3, 'tags': ['lobby']},
+        {'host': '10.0.0.2', 'site': 'ams', 'floor': 4, 'tags': ['wall']},
+        {'host': '10.0.0.3', 'site': 'ber', 'floor': 3},
+        {'host': '10.0.0.4', 'id': 2, 'tags': 'wall'},
+    ])
+
+
+def test_select(inventory):
+    assert inventory.indices() == [0, 1, 2, 3]
+    assert inventory.indices('site=ams') == [0, 1]
+    assert inventory.indices('wall') == [1, 3]
+    assert inventory.indices('!wall') == [0, 2]
+    assert inventory.indices('site=ams & floor=3') == [0]
+    assert inventory.indices('site=nyc') == []
+    assert inventory.targets('id=2') == [('10.0.0.4', 1515, 2)]
+
+
+def test_precedence(inventory):
+    # & binds tighter than |, ! tighter than &
+    assert inventory.indices('site=ber | site=ams & wall') == [1, 2]
+    assert inventory.indices('(site=ber | site=ams) & wall') == [1]
+    assert inventory.indices('!site=ams & floor=3') == [2]
+    assert inventory.indices('!(site=ams & floor=3)') == [1, 2, 3]
+
+
+def test_not_equal_includes_missing_key(inventory):
+    assert inventory.indices('site!=ams') == [2, 3]
+    assert inventory.indices('site & site!=ams') == [2]
+    assert inventory.indices('site != ams') == inventory.indices('site!=ams')
+
+
+@pytest.mark.parametrize('selector, message', [
+    ('site=ams &', 'incomplete selector'),
+    ('(site=ams', 'unbalanced parentheses'),
+    ('site=ams)', r'unexpected "\)"'),
+    ('site=ams wall', 'unexpected "wall"'),
+    ('& wall', 'unexpected "&"'),
+    ('site=', 'invalid selector'),
+])
+def test_invalid_selector(inventory, selector, message):
+    with pytest.raises(ValueError, match=message):
+        inventory.indices(selector)
+
+
+def test_invalid_display():
+    with pytest.raises(ValueError, match='host'):
+        Inventory([{'site': 'ams'}])
+    with pytest.raises(ValueError, match='ipv4'):
+        Inventory([{'host': 'display-1'}])
+
+
+def test_load_json(tmp_path, inventory):
+    path = tmp_path / 'displays.json'
+    path.write_text(json.dumps(list(inventory)))
+    loaded = Inventory.load(str(path))
+    assert len(loaded) == 4
+    assert loaded.indices('wall & floor=4') == [1]
+
+
+def test_load_csv(tmp_path):
+    path = tmp_path / 'displays.csv'
+    path.write_text('host,port,id,site,tags\n'
+                    '10.0.0.1,,,ams,lobby;wall\n'
+                    '10.0.0.2,1516,0x02,ber,\n')
+    inventory = Inventory.load(str(path))
+    assert inventory.indices('lobby & wall') == [0]
+    assert inventory.indices('wall') == [0]
+    assert inventory.indices('port') == [1]
+    assert inventory.targets('site=ber') == [('10.0.0.2', 1516, 2)]
+
+
+def test_load_unknown_extension(tmp_path):
+    with pytest.raises(ValueError, match='.json or .csv'):
+        Inventory.load(str(tmp_path / 'displays.txt'))
@@ -0,0 +1,23 @@
+from samsung_mdc import MultipleDisplayControl, Pacer
+
+from conftest import FakePanel
+
+
+def test_batch(panel):
+    with MultipleDisplayControl('127.0.0.1', panel.port, 1) as mdc:
+        assert mdc.batch([('set_volume', 30), ('get_volume',),
+                          ('get_mute',)]) == [30, 30, False]
+
+
+def test_batch_latency_per_frame():
+    panel = FakePanel(delay=.05)
+    pacer = Pacer()
+    try:
+        with MultipleDisplayControl('127.0.0.1', panel.port, 1,
+                                    pacer=pacer) as mdc:
+            mdc.batch([('get_volume',), ('get_power',), ('get_mute',)])
+    finally:
+        panel.close()
+    # measured from each frame, not from the last one written
+    assert pacer.metrics['acks'] == 3
+    assert pacer.metrics['min_rtt'] >= .04
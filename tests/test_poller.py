@@ -0,0 +1,39 @@
+import time
+
+import pytest
+
+from samsung_mdc import Fleet, Poller
+
+
+class FlakyFleet(Fleet):
+    """Fleet failing its first run."""
+
+    failures = 1
+
+    def run(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('worker gone')
+        return super().run(*args, **kwargs)
+
+
+def test_poll_publishes_changes(panel):
+    poller = Poller([('127.0.0.1', panel.port, 1)], commands=['get_volume'])
+    events = []
+    poller.subscribe(events.append)
+    assert len(poller.poll()) == 1
+    assert poller.poll() == []
+    assert events[0].old is None and events[0].new == 20
+    poller.stop()
+
+
+def test_polling_survives_errors(panel):
+    fleet = FlakyFleet([('127.0.0.1', panel.port, 1)])
+    poller = Poller(fleet, commands=['get_volume'], interval=.05)
+    with pytest.warns(UserWarning, match='poll failed'):
+        with poller:
+            for i in range(40):
+                if poller.state:
+                    break
+                time.sleep(.05)
+    assert poller.state == {(0, 0x12): 20}
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from samsung_mdc import MultipleDisplayControl, Scheduler
+from samsung_mdc.scheduler import (DeadlineExceeded, INTERACTIVE, POLL)
+
+
+def test_call(panel):
+    with Scheduler(MultipleDisplayControl('127.0.0.1', panel.port, 1)) as s:
+        assert s.call('set_volume', 30) == 30
+        assert s.call('get_volume') == 30
+
+
+def test_id_per_request(panel):
+    with Scheduler(MultipleDisplayControl('127.0.0.1', panel.port, 1)) as s:
+        assert s.submit('set_volume', 30, id=2).result(5.) == 30
+        assert s.mdc.id == 2
+        assert s.submit('get_volume', id=1).result(5.) == 30
+
+
+def test_poll_coalescing(slow_panel):
+    mdc = MultipleDisplayControl('127.0.0.1', slow_panel.port, 1)
+    with Scheduler(mdc) as s:
+        s.submit('get_power')  # keeps the worker busy
+        first = s.submit('get_volume', priority=POLL)
+        second = s.submit('get_volume', priority=POLL)
+        assert first is second
+        assert s.submit('get_volume', priority=POLL, id=2) is not first
+
+
+def test_interactive_before_poll(slow_panel):
+    mdc = MultipleDisplayControl('127.0.0.1', slow_panel.port, 1)
+    done = []
+    with Scheduler(mdc) as s:
+        s.submit('get_power')  # in flight
+        poll = s.submit('get_volume', priority=POLL)
+        interactive = s.submit('get_mute', priority=INTERACTIVE)
+        poll.add_done_callback(lambda f: done.append('poll'))
+        interactive.add_done_callback(lambda f: done.append('interactive'))
+        poll.result(5.)
+    assert done == ['interactive', 'poll']
+
+
+def test_queue_expiry_keeps_connection(slow_panel):
+    mdc = MultipleDisplayControl('127.0.0.1', slow_panel.port, 1)
+    with Scheduler(mdc) as s:
+        s.call('get_power')
+        busy = s.submit('get_volume')
+        expired = s.submit('get_mute', deadline=time.monotonic() + .1)
+        with pytest.raises(DeadlineExceeded):
+            expired.result(5.)
+        assert not isinstance(expired.exception(), OSError)
+        busy.result(5.)
+        assert mdc.connected
+    assert slow_panel.connections == 1
+
+
+def test_budget_timeout(slow_panel):
+    mdc = MultipleDisplayControl('127.0.0.1', slow_panel.port, 1)
+    with Scheduler(mdc) as s:
+        future = s.submit('get_volume', deadline=time.monotonic() + .1)
+        with pytest.raises(DeadlineExceeded):
+            future.result(5.)
+        # reconnects, the late reply of the closed connection is discarded
+        assert s.call('get_volume') == 20
+        assert mdc.timeout is None or mdc.timeout > .1
+
+
+def test_connection_refused(closed_port):
+    mdc = MultipleDisplayControl('127.0.0.1', closed_port, 1, timeout=1.)
+    with Scheduler(mdc) as s:
+        with pytest.raises(OSError):
+            s.call('get_power', timeout=5.)